@@ -1,5 +1,6 @@
 """FastAPI backend for SAM2-powered auto-annotation and YOLO dataset export."""
 
+import asyncio
 import io
 import os
 import re
@@ -9,17 +10,21 @@ import tempfile
 import time
 import uuid
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
 from difflib import SequenceMatcher
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import cv2
 from fastapi import BackgroundTasks, FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.requests import Request
 from fastapi.responses import Response
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from PIL import Image
 from pydantic import BaseModel, Field
 
@@ -38,20 +43,59 @@ sam2_service = SAM2Service(MODELS_DIR)
 annotation_service = AnnotationService(models_dir=MODELS_DIR)
 dataset_service = DatasetService(sam2_service)
 
-JOBS: Dict[str, Dict] = {}
+
+@dataclass(slots=True)
+class BatchJob:
+    id: str
+    project_id: str
+    status: str = "running"
+    processed: int = 0
+    skipped: int = 0
+    total: int = 0
+    progress: float = 0.0
+    eta_seconds: Optional[int] = None
+    elapsed_seconds: int = 0
+    last_image: Optional[str] = None
+    last_image_duration_ms: Optional[int] = None
+    total_detections: int = 0
+    objects: List[str] = field(default_factory=list)
+    errors: List[Dict] = field(default_factory=list)
+    # Held while a batch publishes its counters so readers never see half an update
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False, compare=False)
+
+    def to_dict(self, errors_since: int = 0) -> Dict[str, Any]:
+        data = {f.name: getattr(self, f.name) for f in fields(self) if f.name != "lock"}
+        data["objects"] = list(self.objects)
+        data["error_count"] = len(self.errors)
+        # Pollers that already hold the first N errors only need the tail
+        data["errors"] = self.errors[max(0, errors_since):]
+        return data
+
+
+JOBS: Dict[str, BatchJob] = {}
 
 MAX_IMAGE_FILE_BYTES = int(os.getenv("MAX_IMAGE_FILE_BYTES", str(20 * 1024 * 1024)))
 MAX_UPLOAD_FILES = int(os.getenv("MAX_UPLOAD_FILES", "1000"))
 MAX_ZIP_FILE_BYTES = int(os.getenv("MAX_ZIP_FILE_BYTES", str(1024 * 1024 * 1024)))
 MAX_ZIP_MEMBER_BYTES = int(os.getenv("MAX_ZIP_MEMBER_BYTES", str(25 * 1024 * 1024)))
 MAX_ZIP_TOTAL_UNCOMPRESSED_BYTES = int(os.getenv("MAX_ZIP_TOTAL_UNCOMPRESSED_BYTES", str(2 * 1024 * 1024 * 1024)))
+ZIP_EXTRACT_WORKERS = int(os.getenv("ZIP_EXTRACT_WORKERS", str(min(32, os.cpu_count() or 1))))
 MAX_OBJECT_PROMPTS = int(os.getenv("MAX_OBJECT_PROMPTS", "100"))
 MAX_OBJECT_PROMPT_CHARS = int(os.getenv("MAX_OBJECT_PROMPT_CHARS", "64"))
 MAX_JOB_HISTORY = int(os.getenv("MAX_JOB_HISTORY", "200"))
 CLASS_MATCH_MIN_SCORE = float(os.getenv("CLASS_MATCH_MIN_SCORE", "0.68"))
+ANNOTATION_BATCH_SIZE = int(os.getenv("ANNOTATION_BATCH_SIZE", "8"))
 API_KEY = os.getenv("API_KEY", "").strip()
 API_KEY_HEADER = os.getenv("API_KEY_HEADER", "X-API-Key")
 
+# Serializes model work so concurrent jobs and prompt requests do not interleave CUDA kernels.
+# Fixed at 1: the GroundingDINO/SAM predictors (set_image embeddings, prompt token cache) are shared state.
+GPU_SEMAPHORE = asyncio.Semaphore(1)
+
+_PROJECT_NAME_RE = re.compile(r"[A-Za-z0-9 _\-.]+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9 ]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
 _LABEL_STOPWORDS = {
     "a",
     "an",
@@ -104,29 +148,16 @@ def _cors_origins() -> List[str]:
     return origins or ["http://localhost:5173"]
 
 
-def _validate_image_bytes(content: bytes) -> bool:
+def _validate_image_file(source: Path) -> bool:
+    # PIL reads from the file incrementally instead of needing the whole upload in memory.
     try:
-        with Image.open(io.BytesIO(content)) as img:
+        with Image.open(source) as img:
             img.verify()
         return True
     except Exception:
         return False
 
 
-async def _read_limited_upload(upload: UploadFile, max_bytes: int) -> bytes:
-    data: List[bytes] = []
-    total = 0
-    while True:
-        chunk = await upload.read(1024 * 1024)
-        if not chunk:
-            break
-        total += len(chunk)
-        if total > max_bytes:
-            raise HTTPException(status_code=400, detail=f"File too large. Max allowed: {max_bytes} bytes")
-        data.append(chunk)
-    return b"".join(data)
-
-
 async def _save_limited_upload(upload: UploadFile, target_path: Path, max_bytes: int):
     total = 0
     with open(target_path, "wb") as target:
@@ -140,13 +171,61 @@ async def _save_limited_upload(upload: UploadFile, target_path: Path, max_bytes:
             target.write(chunk)
 
 
+def _extract_zip_members(zip_path: Path, members: List[Tuple[str, Path]]) -> List[Path]:
+    # ZipFile handles are not safe to share between threads, so each worker opens its own.
+    extracted: List[Path] = []
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for member, target in members:
+            with zf.open(member) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, length=1024 * 1024)
+            if not _validate_image_file(target):
+                target.unlink(missing_ok=True)
+                continue
+            extracted.append(target)
+    return extracted
+
+
+def _extract_zip_images(zip_path: Path, target_dir: Path) -> List[Path]:
+    members: List[Tuple[str, Path]] = []
+    total_uncompressed = 0
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        info_items = [item for item in zf.infolist() if not item.is_dir()]
+        if len(info_items) > MAX_UPLOAD_FILES:
+            raise HTTPException(status_code=400, detail=f"Too many files in ZIP. Max allowed: {MAX_UPLOAD_FILES}")
+
+        for info in info_items:
+            member_path = Path(info.filename)
+            if member_path.suffix.lower() not in ALLOWED_EXTENSIONS:
+                continue
+            if member_path.is_absolute() or ".." in member_path.parts:
+                continue
+            if info.file_size > MAX_ZIP_MEMBER_BYTES:
+                continue
+            total_uncompressed += info.file_size
+            if total_uncompressed > MAX_ZIP_TOTAL_UNCOMPRESSED_BYTES:
+                raise HTTPException(status_code=400, detail="ZIP content too large after extraction")
+
+            members.append((info.filename, target_dir / f"{uuid.uuid4()}{member_path.suffix.lower()}"))
+
+    if not members:
+        return []
+
+    # Contiguous slices per worker keep the extracted paths in archive order.
+    workers = max(1, min(ZIP_EXTRACT_WORKERS, len(members)))
+    slice_size = -(-len(members) // workers)
+    slices = [members[idx : idx + slice_size] for idx in range(0, len(members), slice_size)]
+    with ThreadPoolExecutor(max_workers=len(slices)) as pool:
+        extracted = pool.map(lambda chunk: _extract_zip_members(zip_path, chunk), slices)
+        return [path for chunk in extracted for path in chunk]
+
+
 def _prune_jobs():
     if len(JOBS) <= MAX_JOB_HISTORY:
         return
     removable = [
         job_id
         for job_id, info in JOBS.items()
-        if info.get("status") in {"completed", "failed"}
+        if info.status in {"completed", "failed"}
     ]
     overflow = len(JOBS) - MAX_JOB_HISTORY
     for job_id in removable[:overflow]:
@@ -159,13 +238,13 @@ def _safe_project_name(name: str) -> str:
         raise HTTPException(status_code=400, detail="Project name cannot be empty")
     if len(cleaned) > 100:
         raise HTTPException(status_code=400, detail="Project name is too long")
-    if not re.fullmatch(r"[A-Za-z0-9 _\-.]+", cleaned):
+    if not _PROJECT_NAME_RE.fullmatch(cleaned):
         raise HTTPException(status_code=400, detail="Project name contains unsupported characters")
     return cleaned
 
 
 def _normalize_label(value: str) -> str:
-    return re.sub(r"\s+", " ", (value or "").strip().lower())
+    return _WHITESPACE_RE.sub(" ", (value or "").strip().lower())
 
 
 def _apply_label_alias(value: str) -> str:
@@ -194,12 +273,13 @@ def _singularize_token(token: str) -> str:
     return token
 
 
-def _tokenize_label(value: str) -> List[str]:
+@lru_cache(maxsize=4096)
+def _tokenize_label(value: str) -> Tuple[str, ...]:
     normalized = _normalize_label(value)
-    normalized = re.sub(r"[^a-z0-9 ]+", " ", normalized)
-    normalized = re.sub(r"\s+", " ", normalized).strip()
+    normalized = _NON_ALNUM_RE.sub(" ", normalized)
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip()
     if not normalized:
-        return []
+        return ()
 
     normalized = _apply_label_alias(normalized)
 
@@ -210,9 +290,10 @@ def _tokenize_label(value: str) -> List[str]:
         token = _apply_label_alias(_singularize_token(token))
         if token and token not in _LABEL_STOPWORDS:
             tokens.append(token)
-    return tokens
+    return tuple(tokens)
 
 
+@lru_cache(maxsize=4096)
 def _canonical_label(value: str) -> str:
     tokens = _tokenize_label(value)
     canonical = " ".join(tokens)
@@ -457,10 +538,29 @@ class AugPreviewRequest(BaseModel):
     augmentations: Dict = Field(default_factory=dict)
 
 
+# File routes: JPEG/ZIP bytes are already compressed, and gzipping a large FileResponse would run on the event loop
+_GZIP_SKIP_PATH_RE = re.compile(r"^/api/projects/[^/]+/(images/[^/]+|augment/preview|export/download|export/coco)$")
+
+
+class _JSONGZipMiddleware:
+    """GZip the JSON API responses only; file/image/zip routes pass through uncompressed"""
+
+    def __init__(self, app, **gzip_options):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, **gzip_options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not _GZIP_SKIP_PATH_RE.match(scope["path"]):
+            await self.gzip_app(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
 app = FastAPI(
     title="AutoMark SAM2 API",
     description="Production-oriented backend for SAM2 auto-annotation and YOLO export",
     version="2.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -471,6 +571,9 @@ app.add_middleware(
     allow_headers=["Authorization", "Content-Type", "Accept"],
 )
 
+# Level 1 is cheap enough for project listings / annotation JSON; tiny job polls skip compression
+app.add_middleware(_JSONGZipMiddleware, minimum_size=512, compresslevel=1)
+
 app.add_middleware(
     TrustedHostMiddleware,
     allowed_hosts=[
@@ -563,10 +666,10 @@ async def upload_images(project_id: str, files: List[UploadFile] = File(...)):
                 continue
             safe_name = f"{uuid.uuid4()}{suffix}"
             target = Path(tmp) / safe_name
-            content = await _read_limited_upload(file, MAX_IMAGE_FILE_BYTES)
-            if not _validate_image_bytes(content):
+            # Stream straight to disk; only one 1 MiB chunk of the upload is held in memory
+            await _save_limited_upload(file, target, MAX_IMAGE_FILE_BYTES)
+            if not _validate_image_file(target):
                 raise HTTPException(status_code=400, detail=f"Invalid image: {file.filename}")
-            target.write_bytes(content)
             temp_paths.append(target)
 
         added = project_service.add_images_from_paths(project_id, temp_paths)
@@ -585,36 +688,7 @@ async def upload_zip(project_id: str, file: UploadFile = File(...)):
         zip_path = Path(tmp) / "images.zip"
         await _save_limited_upload(file, zip_path, MAX_ZIP_FILE_BYTES)
 
-        extracted_paths: List[Path] = []
-        total_uncompressed = 0
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            info_items = [item for item in zf.infolist() if not item.is_dir()]
-            if len(info_items) > MAX_UPLOAD_FILES:
-                raise HTTPException(status_code=400, detail=f"Too many files in ZIP. Max allowed: {MAX_UPLOAD_FILES}")
-
-            for member in zf.namelist():
-                if member.endswith("/"):
-                    continue
-                member_path = Path(member)
-                if member_path.suffix.lower() not in ALLOWED_EXTENSIONS:
-                    continue
-                if member_path.is_absolute() or ".." in member_path.parts:
-                    continue
-
-                info = zf.getinfo(member)
-                if info.file_size > MAX_ZIP_MEMBER_BYTES:
-                    continue
-                total_uncompressed += info.file_size
-                if total_uncompressed > MAX_ZIP_TOTAL_UNCOMPRESSED_BYTES:
-                    raise HTTPException(status_code=400, detail="ZIP content too large after extraction")
-
-                target = Path(tmp) / f"{uuid.uuid4()}{member_path.suffix.lower()}"
-                with zf.open(member) as src, open(target, "wb") as dst:
-                    shutil.copyfileobj(src, dst)
-                if not _validate_image_bytes(target.read_bytes()):
-                    target.unlink(missing_ok=True)
-                    continue
-                extracted_paths.append(target)
+        extracted_paths = await asyncio.to_thread(_extract_zip_images, zip_path, Path(tmp))
 
         added = project_service.add_images_from_paths(project_id, extracted_paths)
 
@@ -688,12 +762,14 @@ async def auto_annotate_single(project_id: str, payload: AutoAnnotateRequest):
     try:
         image = project_service.get_image(project_id, payload.image_id)
         project_service.set_image_status(project_id, payload.image_id, "annotating")
-        result = sam2_service.auto_annotate(
-            image_path=project_service.get_image_path(project_id, payload.image_id),
-            confidence_threshold=payload.confidence_threshold,
-            min_mask_area_ratio=payload.min_mask_area_ratio,
-            max_mask_area_ratio=payload.max_mask_area_ratio,
-        )
+        async with GPU_SEMAPHORE:
+            result = await asyncio.to_thread(
+                sam2_service.auto_annotate,
+                image_path=project_service.get_image_path(project_id, payload.image_id),
+                confidence_threshold=payload.confidence_threshold,
+                min_mask_area_ratio=payload.min_mask_area_ratio,
+                max_mask_area_ratio=payload.max_mask_area_ratio,
+            )
 
         masks = result["masks"]
 
@@ -714,6 +790,102 @@ async def auto_annotate_single(project_id: str, payload: AutoAnnotateRequest):
         raise HTTPException(status_code=500, detail="Auto-annotation failed")
 
 
+def _save_auto_annotation(
+    project_id: str,
+    image_id: str,
+    image: Dict[str, Any],
+    result: Dict[str, Any],
+    req: AutoAnnotateRequest,
+    class_name_map: Dict[str, str],
+    prompt_name_map: Dict[str, str],
+) -> int:
+    if result.get("error"):
+        raise RuntimeError(str(result["error"]))
+
+    image_size = result.get("image_size", {})
+    width = int(image_size.get("width") or image.get("width") or 0)
+    height = int(image_size.get("height") or image.get("height") or 0)
+    if width <= 0 or height <= 0:
+        raise RuntimeError("Invalid image dimensions from annotation pipeline")
+
+    boxes = result.get("boxes", [])
+    labels = result.get("labels", [])
+    scores = result.get("scores", [])
+    segmentations = result.get("segmentations", [])
+    image_area = float(max(1, width * height))
+
+    masks: List[Dict[str, Any]] = []
+    for idx, box in enumerate(boxes):
+        polygon = _polygon_from_detection(
+            segmentations[idx] if idx < len(segmentations) else None,
+            box,
+        )
+        area_ratio = _polygon_area(polygon) / image_area
+
+        if area_ratio < req.min_mask_area_ratio or area_ratio > req.max_mask_area_ratio:
+            continue
+
+        raw_label = str(labels[idx]) if idx < len(labels) else "unlabeled"
+        class_name = _resolve_detected_class_name(raw_label, class_name_map, prompt_name_map)
+        if class_name != "unlabeled":
+            normalized_class_name = _canonical_label(class_name)
+            if normalized_class_name in class_name_map:
+                class_name = class_name_map[normalized_class_name]
+            else:
+                stored_class = project_service.upsert_class(project_id, class_name)
+                canonical_name = _canonical_label(stored_class["name"])
+                class_name_map[canonical_name] = stored_class["name"]
+                prompt_name_map.setdefault(canonical_name, stored_class["name"])
+                class_name = stored_class["name"]
+
+        masks.append(
+            {
+                "id": str(uuid.uuid4()),
+                "class_name": class_name,
+                "score": float(scores[idx]) if idx < len(scores) else 0.0,
+                "area_ratio": float(area_ratio),
+                "polygon": polygon,
+                "bbox": _bbox_from_detection(box, width, height),
+                "source": "grounding_dino_sam",
+                "visible": True,
+            }
+        )
+
+    annotation = {
+        "image_id": image_id,
+        "filename": image["filename"],
+        "width": width,
+        "height": height,
+        "masks": masks,
+        "history": [],
+        "updated_at": time.time(),
+    }
+    project_service.save_annotation(project_id, image_id, annotation)
+    return len(masks)
+
+
+def _record_batch_failure(project_id: str, job_id: str, image_id: str, exc: Exception):
+    JOBS[job_id].skipped += 1
+    JOBS[job_id].errors.append({"image_id": image_id, "error": "annotation_failed"})
+    project_service.log_error(project_id, f"Batch annotate failed for {image_id}: {exc}")
+    project_service.set_image_status(project_id, image_id, "unannotated")
+
+
+def _start_batch(project_id: str, job_id: str, batch_ids: List[str]) -> Tuple[List[Tuple[str, Dict, str]], "asyncio.Task"]:
+    pending: List[Tuple[str, Dict, str]] = []
+    for image_id in batch_ids:
+        try:
+            project_service.set_image_status(project_id, image_id, "annotating")
+            image = project_service.get_image(project_id, image_id)
+            image_path = str(project_service.get_image_path(project_id, image_id))
+            pending.append((image_id, image, image_path))
+        except Exception as exc:
+            _record_batch_failure(project_id, job_id, image_id, exc)
+
+    decode_task = asyncio.create_task(annotation_service.load_images([image_path for _, _, image_path in pending]))
+    return pending, decode_task
+
+
 async def _run_batch_auto_annotate(project_id: str, image_ids: List[str], req: AutoAnnotateRequest, job_id: str):
     start = time.time()
     processed = 0
@@ -733,111 +905,77 @@ async def _run_batch_auto_annotate(project_id: str, image_ids: List[str], req: A
             prompt_name_map[canonical_name] = name
 
     try:
-        warmup_error = await annotation_service.warmup(require_sam=True)
+        async with GPU_SEMAPHORE:
+            warmup_error = await annotation_service.warmup(require_sam=True)
         if warmup_error:
             raise RuntimeError(warmup_error)
     except Exception as exc:
-        JOBS[job_id]["status"] = "failed"
-        JOBS[job_id]["errors"].append({"image_id": None, "error": "warmup_failed"})
+        JOBS[job_id].status = "failed"
+        JOBS[job_id].errors.append({"image_id": None, "error": "warmup_failed"})
         project_service.log_error(project_id, f"Batch annotate warm-up failed: {exc}")
         return
 
-    for image_id in image_ids:
-        item_start = time.time()
-        try:
-            project_service.set_image_status(project_id, image_id, "annotating")
-            image = project_service.get_image(project_id, image_id)
-            result = await annotation_service.annotate_image(
-                image_path=str(project_service.get_image_path(project_id, image_id)),
-                objects=req.objects,
-                box_threshold=req.confidence_threshold,
-                text_threshold=req.text_threshold,
-                use_sam=True,
-                nms_threshold=req.nms_threshold,
-                min_box_size=req.min_box_size,
-            )
-
-            if result.get("error"):
-                raise RuntimeError(str(result["error"]))
-
-            image_size = result.get("image_size", {})
-            width = int(image_size.get("width") or image.get("width") or 0)
-            height = int(image_size.get("height") or image.get("height") or 0)
-            if width <= 0 or height <= 0:
-                raise RuntimeError("Invalid image dimensions from annotation pipeline")
-
-            boxes = result.get("boxes", [])
-            labels = result.get("labels", [])
-            scores = result.get("scores", [])
-            segmentations = result.get("segmentations", [])
-            image_area = float(max(1, width * height))
-
-            masks: List[Dict[str, Any]] = []
-            for idx, box in enumerate(boxes):
-                polygon = _polygon_from_detection(
-                    segmentations[idx] if idx < len(segmentations) else None,
-                    box,
-                )
-                area_ratio = _polygon_area(polygon) / image_area
-
-                if area_ratio < req.min_mask_area_ratio or area_ratio > req.max_mask_area_ratio:
-                    continue
-
-                raw_label = str(labels[idx]) if idx < len(labels) else "unlabeled"
-                class_name = _resolve_detected_class_name(raw_label, class_name_map, prompt_name_map)
-                if class_name != "unlabeled":
-                    normalized_class_name = _canonical_label(class_name)
-                    if normalized_class_name in class_name_map:
-                        class_name = class_name_map[normalized_class_name]
-                    else:
-                        stored_class = project_service.upsert_class(project_id, class_name)
-                        canonical_name = _canonical_label(stored_class["name"])
-                        class_name_map[canonical_name] = stored_class["name"]
-                        prompt_name_map.setdefault(canonical_name, stored_class["name"])
-                        class_name = stored_class["name"]
-
-                masks.append(
-                    {
-                        "id": str(uuid.uuid4()),
-                        "class_name": class_name,
-                        "score": float(scores[idx]) if idx < len(scores) else 0.0,
-                        "area_ratio": float(area_ratio),
-                        "polygon": polygon,
-                        "bbox": _bbox_from_detection(box, width, height),
-                        "source": "grounding_dino_sam",
-                        "visible": True,
-                    }
-                )
-
-            annotation = {
-                "image_id": image_id,
-                "filename": image["filename"],
-                "width": width,
-                "height": height,
-                "masks": masks,
-                "history": [],
-                "updated_at": time.time(),
-            }
-            project_service.save_annotation(project_id, image_id, annotation)
-            JOBS[job_id]["processed"] += 1
-            JOBS[job_id]["last_image"] = image["filename"]
-        except Exception as exc:
-            JOBS[job_id]["skipped"] += 1
-            JOBS[job_id]["errors"].append({"image_id": image_id, "error": "annotation_failed"})
-            project_service.log_error(project_id, f"Batch annotate failed for {image_id}: {exc}")
-            project_service.set_image_status(project_id, image_id, "unannotated")
-
-        processed += 1
+    batch_size = max(1, ANNOTATION_BATCH_SIZE)
+    batches = [image_ids[idx : idx + batch_size] for idx in range(0, len(image_ids), batch_size)]
+    next_batch = _start_batch(project_id, job_id, batches[0]) if batches else None
+
+    for batch_index, batch_ids in enumerate(batches):
+        batch_item_start = time.time()
+        pending, decode_task = next_batch
+        decoded = await decode_task
+
+        # Decode the following batch while this one runs on the GPU.
+        if batch_index + 1 < len(batches):
+            next_batch = _start_batch(project_id, job_id, batches[batch_index + 1])
+
+        results: List[Dict[str, Any]] = []
+        if pending:
+            try:
+                async with GPU_SEMAPHORE:
+                    results = await annotation_service.annotate_batch_gpu(
+                        image_paths=[image_path for _, _, image_path in pending],
+                        objects=req.objects,
+                        box_threshold=req.confidence_threshold,
+                        text_threshold=req.text_threshold,
+                        use_sam=True,
+                        nms_threshold=req.nms_threshold,
+                        min_box_size=req.min_box_size,
+                        decoded=decoded,
+                    )
+            except Exception as exc:
+                results = [{"error": str(exc)} for _ in pending]
+
+        job = JOBS[job_id]
+        saved_images = 0
+        saved_masks = 0
+        last_image = None
+        for (image_id, image, _), result in zip(pending, results):
+            try:
+                saved_masks += _save_auto_annotation(project_id, image_id, image, result, req, class_name_map, prompt_name_map)
+                saved_images += 1
+                last_image = image["filename"]
+            except Exception as exc:
+                _record_batch_failure(project_id, job_id, image_id, exc)
+
+        # Per-image timing is amortized over the batch that shared the forward pass.
+        item_duration = (time.time() - batch_item_start) / len(batch_ids)
+        processed += len(batch_ids)
         elapsed = time.time() - start
         avg = elapsed / processed if processed else 0
         remaining = max(0, len(image_ids) - processed)
-        JOBS[job_id]["progress"] = round(100 * processed / len(image_ids), 2)
-        JOBS[job_id]["eta_seconds"] = int(avg * remaining)
-        JOBS[job_id]["elapsed_seconds"] = int(elapsed)
-        JOBS[job_id]["last_image_duration_ms"] = int((time.time() - item_start) * 1000)
+        async with job.lock:
+            job.processed += saved_images
+            job.total_detections += saved_masks
+            if last_image is not None:
+                job.last_image = last_image
+            job.progress = round(100 * processed / len(image_ids), 2)
+            job.eta_seconds = int(avg * remaining)
+            job.elapsed_seconds = int(elapsed)
+            job.last_image_duration_ms = int(item_duration * 1000)
 
-    if JOBS[job_id]["status"] == "running":
-        JOBS[job_id]["status"] = "completed"
+    async with JOBS[job_id].lock:
+        if JOBS[job_id].status == "running":
+            JOBS[job_id].status = "completed"
 
 
 @app.post("/api/projects/{project_id}/annotate/auto/batch")
@@ -862,42 +1000,37 @@ async def auto_annotate_batch(project_id: str, payload: AutoAnnotateRequest, bac
     _prune_jobs()
 
     job_id = str(uuid.uuid4())
-    JOBS[job_id] = {
-        "id": job_id,
-        "project_id": project_id,
-        "status": "running",
-        "processed": 0,
-        "skipped": 0,
-        "total": len(image_ids),
-        "progress": 0.0,
-        "eta_seconds": None,
-        "elapsed_seconds": 0,
-        "last_image": None,
-        "last_image_duration_ms": None,
-        "objects": objects,
-        "errors": [],
-    }
+    JOBS[job_id] = BatchJob(
+        id=job_id,
+        project_id=project_id,
+        total=len(image_ids),
+        objects=objects,
+    )
 
     background_tasks.add_task(_run_batch_auto_annotate, project_id, image_ids, payload, job_id)
-    return JOBS[job_id]
+    return JOBS[job_id].to_dict()
 
 
 @app.get("/api/jobs/{job_id}")
-async def job_status(job_id: str):
-    if job_id not in JOBS:
+async def job_status(job_id: str, errors_since: int = 0):
+    job = JOBS.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    return JOBS[job_id]
+    async with job.lock:
+        return job.to_dict(errors_since=errors_since)
 
 
 @app.post("/api/projects/{project_id}/annotate/point")
 async def annotate_by_point(project_id: str, payload: PointPromptRequest):
     try:
         annotation = project_service.load_annotation(project_id, payload.image_id)
-        mask = sam2_service.prompt_by_point(
-            image_path=project_service.get_image_path(project_id, payload.image_id),
-            x=payload.x,
-            y=payload.y,
-        )
+        async with GPU_SEMAPHORE:
+            mask = await asyncio.to_thread(
+                sam2_service.prompt_by_point,
+                image_path=project_service.get_image_path(project_id, payload.image_id),
+                x=payload.x,
+                y=payload.y,
+            )
         if mask is None:
             raise HTTPException(status_code=404, detail="No mask found for that point")
 
@@ -913,10 +1046,12 @@ async def annotate_by_point(project_id: str, payload: PointPromptRequest):
 async def annotate_by_box(project_id: str, payload: BoxPromptRequest):
     try:
         annotation = project_service.load_annotation(project_id, payload.image_id)
-        mask = sam2_service.prompt_by_box(
-            image_path=project_service.get_image_path(project_id, payload.image_id),
-            box=[payload.x1, payload.y1, payload.x2, payload.y2],
-        )
+        async with GPU_SEMAPHORE:
+            mask = await asyncio.to_thread(
+                sam2_service.prompt_by_box,
+                image_path=project_service.get_image_path(project_id, payload.image_id),
+                box=[payload.x1, payload.y1, payload.x2, payload.y2],
+            )
         if mask is None:
             raise HTTPException(status_code=404, detail="No mask found for that box")
 
@@ -17,15 +17,32 @@ Key accuracy features:
 import os
 import re
 import asyncio
+import importlib.util
+from collections import OrderedDict
 import torch
 import numpy as np
 import cv2
 from pathlib import Path
 from difflib import SequenceMatcher
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
-from PIL import Image
 from concurrent.futures import ThreadPoolExecutor
 
+# Optional: libjpeg-turbo decoding for JPEGs (SIMD IDCT + colour conversion)
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _TJ = TurboJPEG()
+except Exception:  # package or the libturbojpeg shared library missing
+    _TJ = None
+
+# Optional: COCO run-length encoding of SAM masks (mask_format="rle")
+try:
+    from pycocotools import mask as mask_util
+except ImportError:
+    mask_util = None
+
+MASK_FORMATS = ("polygon", "rle")
+
 # Model paths
 DEFAULT_MODELS_DIR = Path(os.environ.get("MODELS_DIR", "./models"))
 GROUNDING_DINO_MODEL_ID = os.environ.get("GROUNDING_DINO_MODEL_ID", "IDEA-Research/grounding-dino-base")
@@ -33,6 +50,15 @@ GROUNDING_DINO_MODEL_REVISION = os.environ.get(
     "GROUNDING_DINO_MODEL_REVISION",
     "12bdfa3120f3e7ec7b434d90674b3396eccf88eb",
 )
+# Square input size the processor resizes/pads to when torch.compile runs with static shapes (0 = processor default)
+GROUNDING_DINO_INPUT_SIZE = int(os.environ.get("GROUNDING_DINO_INPUT_SIZE", "800"))
+# Prompt tokens are padded to this length for static-shape compile and FP8 (Grounding DINO's max_text_len)
+GROUNDING_DINO_TEXT_LENGTH = int(os.environ.get("GROUNDING_DINO_TEXT_LENGTH", "256"))
+# fp16 (default) | int8 (CPU dynamic quantization) | fp8 (Ada/Hopper + transformer_engine)
+GROUNDING_DINO_PRECISION = os.environ.get("GROUNDING_DINO_PRECISION", "fp16").strip().lower()
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9 ]+")
+_WHITESPACE_RE = re.compile(r"\s+")
 
 _LABEL_STOPWORDS = {"a", "an", "the", "of", "and", "or", "object", "objects", "item", "items"}
 _LABEL_ALIASES = {
@@ -65,9 +91,45 @@ _LABEL_ALIASES = {
     "canine": "dog",
 }
 
+# Number of images sent through Grounding DINO in one forward pass
+DEFAULT_BATCH_SIZE = int(os.environ.get("ANNOTATION_BATCH_SIZE", "8"))
+
+# Boxes decoded together by SAM; bounds the (N, H, W) full-resolution mask tensor on the GPU
+SAM_BOX_BATCH_SIZE = int(os.environ.get("SAM_BOX_BATCH_SIZE", "16"))
+
+# SAM image embeddings kept in memory, keyed by image path + mtime
+SAM_EMBEDDING_CACHE_SIZE = int(os.environ.get("SAM_EMBEDDING_CACHE_SIZE", "8"))
+
+# Tokenized Grounding DINO prompts kept in memory, keyed by prompt text
+_TEXT_CACHE_SIZE = 256
+
+# annotate_batch progress callbacks fire every N images or after this many seconds, whichever comes first
+_PROGRESS_EVERY_IMAGES = 8
+_PROGRESS_INTERVAL_SECONDS = 0.1
+
 # Thread pool for running sync inference off the event loop (Bug 5)
 _executor = ThreadPoolExecutor(max_workers=1)
 
+# Separate pool for image decoding so the next batch can be decoded while the GPU is busy
+_decode_executor = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+
+
+_JPEG_SUFFIXES = {".jpg", ".jpeg"}
+
+
+def _load_rgb(image_path: str) -> np.ndarray:
+    """Decode an image to an RGB (H, W, 3) uint8 array, ignoring EXIF orientation like PIL does"""
+    if _TJ is not None and Path(image_path).suffix.lower() in _JPEG_SUFFIXES:
+        try:
+            with open(image_path, "rb") as f:
+                return _TJ.decode(f.read(), pixel_format=TJPF_RGB)
+        except Exception:
+            pass  # progressive/CMYK or corrupt JPEGs: let OpenCV try
+    image_bgr = cv2.imread(str(image_path), cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image_bgr is None:
+        raise ValueError(f"Unable to read image: {image_path}")
+    return cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+
 
 class AnnotationService:
     """Service for running Grounding DINO + SAM annotations with high accuracy"""
@@ -82,6 +144,12 @@ class AnnotationService:
         self._sam_loaded = False
         self.models_dir = Path(models_dir) if models_dir else DEFAULT_MODELS_DIR
         self.sam_checkpoint = self.models_dir / "sam_vit_b_01ec64.pth"
+        self._sam_embedding_cache: "OrderedDict[Tuple[str, float], Tuple]" = OrderedDict()
+        self._text_cache: "OrderedDict[str, Dict[str, torch.Tensor]]" = OrderedDict()
+        self._copy_stream = None
+        # Set when the model is compiled for static shapes: prompt and batch shapes get padded to fixed sizes
+        self._text_pad_length = 0
+        self._pad_batches = False
         
         print(f"[INFO] Annotation Service initialized")
         print(f"   Device: {self.device}")
@@ -89,10 +157,31 @@ class AnnotationService:
         print(f"   Models Directory: {self.models_dir.absolute()}")
         print(f"   SAM Checkpoint: {self.sam_checkpoint}")
         
-        # Bug 2: Only use FP16 on CUDA
-        self.use_fp16 = self.device == "cuda" and torch.cuda.is_available()
+        # Bug 2: Only use FP16 on CUDA (FP8 keeps FP16 for the layers it cannot convert)
+        self.precision = self._resolve_precision(GROUNDING_DINO_PRECISION)
+        self.use_fp16 = self.precision in ("fp16", "fp8")
+        self._fp8_autocast = None
+        self._fp8_recipe = None
+        # Input shapes whose FP8 forward failed once; they go straight to fp16 from then on
+        self._fp8_failed_shapes: set = set()
         if self.use_fp16:
             print(f"   FP16 Inference: Enabled (faster)")
+        print(f"   Precision: {self.precision}")
+    
+    def _resolve_precision(self, requested: str) -> str:
+        """Map the requested Grounding DINO precision onto what this device supports"""
+        if requested not in ("fp16", "int8", "fp8"):
+            print(f"[WARN] Unknown GROUNDING_DINO_PRECISION '{requested}', using fp16")
+            requested = "fp16"
+        if self.device != "cuda":
+            return "int8" if requested == "int8" else "fp32"
+        if requested == "fp8":
+            if torch.cuda.get_device_capability() >= (8, 9) and importlib.util.find_spec("transformer_engine"):
+                return "fp8"
+            print("[WARN] FP8 needs an Ada/Hopper GPU and transformer_engine, using fp16")
+        elif requested == "int8":
+            print("[WARN] INT8 dynamic quantization only runs on CPU, using fp16")
+        return "fp16"
     
     async def _load_model(self):
         """Load Grounding DINO BASE model from HuggingFace for maximum accuracy"""
@@ -113,22 +202,50 @@ class AnnotationService:
                 revision=GROUNDING_DINO_MODEL_REVISION,
                 trust_remote_code=False,
             )
+            static_shapes = self._can_pin_input_size(GROUNDING_DINO_INPUT_SIZE)
             self.model = AutoModelForZeroShotObjectDetection.from_pretrained(
                 GROUNDING_DINO_MODEL_ID,
                 revision=GROUNDING_DINO_MODEL_REVISION,
                 trust_remote_code=False,
             )
             self.model = self.model.to(self.device)
+            # Side stream for host-to-device input copies so they can overlap with compute
+            if self.device == "cuda":
+                self._copy_stream = torch.cuda.Stream()
             
             # Bug 2: Enable FP16 only on CUDA
             if self.use_fp16:
                 self.model = self.model.half()
                 print("   Using FP16 precision for faster inference")
             
+            if self.precision == "int8":
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                print("   Using INT8 dynamic quantization for Linear layers")
+            elif self.precision == "fp8":
+                self._enable_fp8()
+                # A fixed prompt length (a multiple of 16) keeps the text-side GEMMs FP8-eligible
+                self._text_pad_length = GROUNDING_DINO_TEXT_LENGTH
+            
+            # channels_last lets convolution / tensor-core kernels skip layout transposes
+            self.model = self.model.to(memory_format=torch.channels_last)
+            
             # Try torch.compile for additional speedup (PyTorch 2.0+)
             try:
+                if self.precision in ("int8", "fp8"):
+                    # Quantized / Transformer Engine kernels do not trace cleanly
+                    raise RuntimeError(f"not supported with {self.precision} layers")
                 import torch._dynamo
-                self.model = torch.compile(self.model, mode="reduce-overhead")
+                if static_shapes:
+                    self.model = torch.compile(self.model, mode="max-autotune", dynamic=False)
+                    # Only a static-shape graph is worth the smaller input: pin images, fixed prompt
+                    # length and power-of-two batches bound the graphs to a handful of shapes
+                    self._pin_input_size(GROUNDING_DINO_INPUT_SIZE)
+                    self._text_pad_length = GROUNDING_DINO_TEXT_LENGTH
+                    self._pad_batches = True
+                else:
+                    self.model = torch.compile(self.model, mode="reduce-overhead")
                 print("   torch.compile enabled")
             except Exception as compile_exc:
                 print(f"   torch.compile unavailable: {compile_exc}")
@@ -143,6 +260,69 @@ class AnnotationService:
             print(f"[ERROR] Could not load Grounding DINO BASE model: {e}")
             return False
     
+    def _enable_fp8(self):
+        """Swap eligible nn.Linear layers for Transformer Engine ones so they run as FP8 GEMMs"""
+        import transformer_engine.pytorch as te
+        from transformer_engine.common.recipe import DelayedScaling, Format
+        
+        swapped = 0
+        for module in list(self.model.modules()):
+            for name, child in list(module.named_children()):
+                # FP8 GEMMs need both feature dimensions divisible by 16
+                if not isinstance(child, torch.nn.Linear) or child.in_features % 16 or child.out_features % 16:
+                    continue
+                replacement = te.Linear(
+                    child.in_features,
+                    child.out_features,
+                    bias=child.bias is not None,
+                    params_dtype=child.weight.dtype,
+                    device=child.weight.device,
+                )
+                with torch.no_grad():
+                    replacement.weight.copy_(child.weight)
+                    if child.bias is not None:
+                        replacement.bias.copy_(child.bias)
+                setattr(module, name, replacement)
+                swapped += 1
+        
+        self._fp8_autocast = te.fp8_autocast
+        self._fp8_recipe = DelayedScaling(fp8_format=Format.HYBRID)
+        print(f"   Using FP8 for {swapped} Linear layers (transformer_engine)")
+    
+    def _forward_detection(self, inputs: Dict[str, torch.Tensor]):
+        """Grounding DINO forward pass, inside fp8_autocast when FP8 is enabled"""
+        if self._fp8_autocast is not None:
+            shape_key = tuple((key, tuple(value.shape)) for key, value in inputs.items())
+            if shape_key not in self._fp8_failed_shapes:
+                try:
+                    with self._fp8_autocast(enabled=True, fp8_recipe=self._fp8_recipe):
+                        return self.model(**inputs)
+                except torch.cuda.OutOfMemoryError:
+                    # Retrying in fp16 would only hit the same wall
+                    raise
+                except (AssertionError, RuntimeError) as exc:
+                    # Token counts that are not multiples of 8/16 make FP8 GEMMs fail; skip FP8 for this shape
+                    self._fp8_failed_shapes.add(shape_key)
+                    print(f"[WARN] FP8 forward failed for input shapes {shape_key}, using fp16 for them: {exc}")
+        return self.model(**inputs)
+    
+    def _can_pin_input_size(self, size: int) -> bool:
+        """True when the processor can resize and pad every image to one fixed ``size`` x ``size``"""
+        if size <= 0:
+            return False
+        if not hasattr(self.processor.image_processor, "pad_size"):
+            print("   Processor has no pad_size; input shapes stay dynamic")
+            return False
+        return True
+    
+    def _pin_input_size(self, size: int):
+        """Resize and pad every image to ``size`` x ``size`` (only after ``_can_pin_input_size``)"""
+        image_processor = self.processor.image_processor
+        image_processor.size = {"shortest_edge": size, "longest_edge": size}
+        image_processor.do_pad = True
+        image_processor.pad_size = {"height": size, "width": size}
+        print(f"   Input size pinned to {size}x{size}")
+    
     async def _load_sam(self):
         """Load SAM model for segmentation"""
         if self._sam_loaded:
@@ -210,41 +390,105 @@ class AnnotationService:
         text_threshold: float = 0.20,
         use_sam: bool = True,
         nms_threshold: float = 0.5,
-        min_box_size: int = 10
+        min_box_size: int = 10,
+        mask_format: str = "polygon"
     ) -> Dict:
         """
         Annotate a single image with Grounding DINO + SAM.
         Runs sync inference in a thread executor to avoid blocking the event loop.
+        ``mask_format="rle"`` returns COCO RLE masks under ``rles`` instead of polygons.
+        """
+        mask_format = self._resolve_mask_format(mask_format)
+        decoded = await self.load_images([image_path])
+        loop = asyncio.get_event_loop()
+        results = await loop.run_in_executor(
+            _executor,
+            self._run_sync_batch_pipeline,
+            [image_path], objects, box_threshold, text_threshold,
+            use_sam, nms_threshold, min_box_size, decoded, mask_format
+        )
+        return results[0]
+
+    async def load_images(self, image_paths: List[str]) -> List:
+        """
+        Decode images in the decode pool.
+        Each entry is an RGB ``np.ndarray`` or the exception raised while loading it.
+        """
+        loop = asyncio.get_event_loop()
+        return await asyncio.gather(
+            *(loop.run_in_executor(_decode_executor, _load_rgb, path) for path in image_paths),
+            return_exceptions=True
+        )
+
+    async def annotate_batch_gpu(
+        self,
+        image_paths: List[str],
+        objects: List[str],
+        box_threshold: float = 0.25,
+        text_threshold: float = 0.20,
+        use_sam: bool = True,
+        nms_threshold: float = 0.5,
+        min_box_size: int = 10,
+        decoded: Optional[List] = None,
+        mask_format: str = "polygon"
+    ) -> List[Dict]:
         """
+        Annotate a group of images with one Grounding DINO forward pass per class.
+        Results are returned in the same order as ``image_paths``.
+        ``decoded`` may carry the output of a previous ``load_images`` call (prefetch).
+        """
+        mask_format = self._resolve_mask_format(mask_format)
+        if decoded is None:
+            decoded = await self.load_images(image_paths)
         loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
+        return await loop.run_in_executor(
             _executor,
-            self._run_sync_pipeline,
-            image_path, objects, box_threshold, text_threshold,
-            use_sam, nms_threshold, min_box_size
+            self._run_sync_batch_pipeline,
+            image_paths, objects, box_threshold, text_threshold,
+            use_sam, nms_threshold, min_box_size, decoded, mask_format
         )
-        return result
     
-    def _run_sync_pipeline(
+    @staticmethod
+    def _resolve_mask_format(mask_format: str) -> str:
+        """Validate ``mask_format``, falling back to polygons when pycocotools is not installed"""
+        if mask_format not in MASK_FORMATS:
+            raise ValueError(f"Unsupported mask format: {mask_format}")
+        if mask_format == "rle" and mask_util is None:
+            print("[WARN] pycocotools not installed, returning polygon masks")
+            return "polygon"
+        return mask_format
+    
+    def _run_sync_batch_pipeline(
         self,
-        image_path: str,
+        image_paths: List[str],
         objects: List[str],
         box_threshold: float,
         text_threshold: float,
         use_sam: bool,
         nms_threshold: float,
-        min_box_size: int
-    ) -> Dict:
-        """Synchronous detection + segmentation pipeline (runs in thread)"""
-        # Load image at full resolution for maximum accuracy
-        try:
-            image = Image.open(image_path).convert("RGB")
-            image_np = np.array(image)
-        except Exception as e:
-            print(f"Error loading image {image_path}: {e}")
-            return {"boxes": [], "labels": [], "scores": [], "segmentations": [], "error": str(e)}
-        
-        width, height = image.size
+        min_box_size: int,
+        decoded: Optional[List] = None,
+        mask_format: str = "polygon"
+    ) -> List[Dict]:
+        """Batched detection + per-image segmentation pipeline (runs in thread)"""
+        results: List[Optional[Dict]] = [None] * len(image_paths)
+
+        # Load images at full resolution for maximum accuracy
+        loaded = []
+        for idx, image_path in enumerate(image_paths):
+            try:
+                item = decoded[idx] if decoded is not None else _load_rgb(image_path)
+                if isinstance(item, BaseException):
+                    raise item
+                image_np = item
+            except Exception as e:
+                print(f"Error loading image {image_path}: {e}")
+                results[idx] = {"boxes": [], "labels": [], "scores": [], "segmentations": [], "error": str(e)}
+                continue
+            loaded.append((idx, image_path, image_np))
+
+        if not loaded:
+            return results
 
         # Avoid repeated event-loop setup once models are loaded.
         model_ready = True
@@ -253,31 +497,71 @@ class AnnotationService:
         
         if not model_ready:
             # Bug 6: Return clear error instead of mock annotations
-            return {
-                "boxes": [],
-                "labels": [],
-                "scores": [],
-                "segmentations": [],
-                "error": "Model failed to load — no annotations generated. Check server logs.",
-                "image_size": {"width": width, "height": height}
-            }
-        
-        # --- PER-CLASS DETECTION for maximum accuracy ---
-        all_boxes = []
-        all_labels = []
-        all_scores = []
+            for idx, _, image_np in loaded:
+                height, width = image_np.shape[:2]
+                results[idx] = {
+                    "boxes": [],
+                    "labels": [],
+                    "scores": [],
+                    "segmentations": [],
+                    "error": "Model failed to load — no annotations generated. Check server logs.",
+                    "image_size": {"width": width, "height": height}
+                }
+            return results
         
+        # The processor accepts arrays directly, so no PIL image is built
+        images = [image_np for _, _, image_np in loaded]
+        sizes = [(image.shape[1], image.shape[0]) for image in images]
+        detections = [{"boxes_xyxy": [], "labels": [], "scores": []} for _ in loaded]
+
+        # --- PER-CLASS DETECTION for maximum accuracy, batched across images ---
         for obj in objects:
             try:
-                result = self._run_detection_sync(image, [obj], box_threshold, text_threshold, width, height)
-                if result["boxes"]:
-                    all_boxes.extend(result["boxes"])
-                    all_labels.extend(result["labels"])
-                    all_scores.extend(result["scores"])
+                batch_results = self._run_detection_batch_sync(images, [obj], box_threshold, text_threshold, sizes)
             except Exception as e:
-                print(f"[WARN] Detection failed for '{obj}': {e}")
-        
-        if not all_boxes:
+                # Retry one image at a time so a single bad input does not drop the class for the whole batch
+                print(f"[WARN] Batched detection failed for '{obj}', retrying per image: {e}")
+                batch_results = []
+                for image, size in zip(images, sizes):
+                    try:
+                        batch_results.extend(
+                            self._run_detection_batch_sync([image], [obj], box_threshold, text_threshold, [size])
+                        )
+                    except Exception as inner:
+                        print(f"[WARN] Detection failed for '{obj}': {inner}")
+                        batch_results.append(None)
+
+            for acc, result in zip(detections, batch_results):
+                if result and len(result["boxes_xyxy"]):
+                    acc["boxes_xyxy"].append(result["boxes_xyxy"])
+                    acc["labels"].extend(result["labels"])
+                    acc["scores"].append(result["scores"])
+
+        for (idx, image_path, image_np), (width, height), acc in zip(loaded, sizes, detections):
+            boxes_xyxy = np.concatenate(acc["boxes_xyxy"]) if acc["boxes_xyxy"] else np.zeros((0, 4))
+            scores = np.concatenate(acc["scores"]) if acc["scores"] else np.zeros(0)
+            results[idx] = self._finalize_detections(
+                image_path, image_np, boxes_xyxy, acc["labels"], scores,
+                width, height, use_sam, nms_threshold, min_box_size, mask_format
+            )
+        return results
+
+    def _finalize_detections(
+        self,
+        image_path: str,
+        image_np: np.ndarray,
+        boxes_xyxy: np.ndarray,
+        all_labels: List[str],
+        all_scores: np.ndarray,
+        width: int,
+        height: int,
+        use_sam: bool,
+        nms_threshold: float,
+        min_box_size: int,
+        mask_format: str = "polygon"
+    ) -> Dict:
+        """Filter, de-duplicate and segment the merged per-class detections of one image"""
+        if not len(boxes_xyxy):
             return {
                 "boxes": [],
                 "labels": [],
@@ -288,26 +572,20 @@ class AnnotationService:
         
         # --- POST-PROCESSING ---
         # 1. Filter tiny boxes
-        all_boxes, all_labels, all_scores = self._filter_small_boxes(
-            all_boxes, all_labels, all_scores, min_box_size
+        boxes_xyxy, all_labels, all_scores = self._filter_small_boxes(
+            boxes_xyxy, all_labels, all_scores, min_box_size
         )
         
-        # 2. Apply NMS to remove duplicate/overlapping detections
-        all_boxes, all_labels, all_scores = self._apply_nms(
-            all_boxes, all_labels, all_scores, nms_threshold
+        # 2. Apply NMS to remove duplicate/overlapping detections (result is sorted by score descending)
+        boxes_xyxy, all_labels, all_scores = self._apply_nms(
+            boxes_xyxy, all_labels, all_scores, nms_threshold
         )
         
-        # 3. Sort by score descending
-        if all_scores:
-            sorted_indices = sorted(range(len(all_scores)), key=lambda i: all_scores[i], reverse=True)
-            all_boxes = [all_boxes[i] for i in sorted_indices]
-            all_labels = [all_labels[i] for i in sorted_indices]
-            all_scores = [all_scores[i] for i in sorted_indices]
-        
+        # 3. Materialize per-box dicts only for the detections that survived
         detection_result = {
-            "boxes": all_boxes,
+            "boxes": self._boxes_to_dicts(boxes_xyxy, width, height),
             "labels": all_labels,
-            "scores": all_scores,
+            "scores": all_scores.tolist(),
             "segmentations": [],
             "image_size": {"width": width, "height": height}
         }
@@ -324,20 +602,29 @@ class AnnotationService:
             
             if sam_ready:
                 try:
-                    segmentations = self._run_segmentation_sync(image_np, detection_result["boxes"])
-                    detection_result["segmentations"] = segmentations
+                    if mask_format == "rle":
+                        # COCO consumers only need RLE: skip contour extraction and fit boxes on the raw masks
+                        masks = self._segment_masks(image_np, detection_result["boxes"], image_path)
+                        detection_result["rles"] = self._encode_rles(masks)
+                    else:
+                        segmentations = self._run_segmentation_sync(image_np, detection_result["boxes"], image_path)
+                        detection_result["segmentations"] = segmentations
+                        masks = None
                     
                     # Bug 7: Apply shape-aware bounding boxes after SAM
                     for i, box in enumerate(detection_result["boxes"]):
-                        if i < len(segmentations) and segmentations[i]:
+                        if masks is not None or (i < len(segmentations) and segmentations[i]):
                             label = detection_result["labels"][i] if i < len(detection_result["labels"]) else "object"
-                            # Build a mask from the segmentation polygon
                             try:
-                                mask = np.zeros((height, width), dtype=np.uint8)
-                                for poly in segmentations[i]:
-                                    if poly and len(poly) >= 6:
-                                        pts = np.array(poly, dtype=np.float32).reshape(-1, 2).astype(np.int32)
-                                        cv2.fillPoly(mask, [pts], 255)
+                                if masks is not None:
+                                    mask = masks[i]
+                                else:
+                                    # Build a mask from the segmentation polygon
+                                    mask = np.zeros((height, width), dtype=np.uint8)
+                                    for poly in segmentations[i]:
+                                        if poly and len(poly) >= 6:
+                                            pts = np.array(poly, dtype=np.float32).reshape(-1, 2).astype(np.int32)
+                                            cv2.fillPoly(mask, [pts], 255)
                                 
                                 shape_result = self._fit_shape_aware_box(mask, label)
                                 if shape_result:
@@ -356,6 +643,7 @@ class AnnotationService:
                 except Exception as e:
                     print(f"[WARN] Segmentation failed: {e}")
                     detection_result["segmentations"] = []
+                    detection_result.pop("rles", None)
                     for box in detection_result["boxes"]:
                         box["shape_type"] = "rectangle"
             else:
@@ -451,10 +739,11 @@ class AnnotationService:
         return cleaned
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def _normalize_label_text(value: str) -> str:
         value = (value or "").strip().lower().rstrip(".")
-        value = re.sub(r"[^a-z0-9 ]+", " ", value)
-        value = re.sub(r"\s+", " ", value).strip()
+        value = _NON_ALNUM_RE.sub(" ", value)
+        value = _WHITESPACE_RE.sub(" ", value).strip()
         if value in _LABEL_ALIASES:
             value = _LABEL_ALIASES[value]
         squashed = value.replace(" ", "")
@@ -499,88 +788,176 @@ class AnnotationService:
 
         return min(1.0, 0.65 * token_score + 0.35 * char_score + containment_bonus + semantic_bonus)
     
-    def _run_detection_sync(
+    def _run_detection_batch_sync(
         self,
-        image: Image.Image,
+        images: List[np.ndarray],
         objects: List[str],
         box_threshold: float,
         text_threshold: float,
-        width: int,
-        height: int
-    ) -> Dict:
-        """Run Grounding DINO detection with optimized prompts (synchronous)"""
+        sizes: List[Tuple[int, int]]
+    ) -> List[Dict]:
+        """Run Grounding DINO detection on a batch of images with one forward pass (synchronous)"""
         # Build optimized text prompt
         text = self._build_text_prompt(objects)
         
-        inputs = self.processor(images=image, text=text, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        # Tokenize the prompt once and only run the image processor per batch
+        inputs = dict(self.processor.image_processor(
+            images=images, return_tensors="pt", input_data_format="channels_last"
+        ))
+        batch = len(images)
+        padded = self._padded_batch_size(batch)
+        if padded > batch:
+            # Repeat the last image so the compiled graph only ever sees a few batch sizes
+            for key, value in inputs.items():
+                inputs[key] = torch.cat([value, value[-1:].expand(padded - batch, *value.shape[1:])])
+        for key, value in self._tokenize_prompt(text).items():
+            inputs[key] = value.repeat(padded, 1)
+        inputs = self._prepare_inputs(inputs)
         
-        # Use FP16 for inputs if enabled
-        if self.use_fp16:
-            inputs = {k: v.half() if v.dtype == torch.float32 else v for k, v in inputs.items()}
+        # The model is already .half() on CUDA, so autocast would only add per-op dispatch overhead
+        with torch.inference_mode():
+            outputs = self._forward_detection(inputs)
+        if padded > batch:
+            outputs.logits = outputs.logits[:batch]
+            outputs.pred_boxes = outputs.pred_boxes[:batch]
+            inputs = {key: value[:batch] for key, value in inputs.items()}
         
-        with torch.no_grad():
-            # Bug 1: Use torch.amp.autocast with device_type parameter
-            if self.use_fp16 and self.device == "cuda":
-                with torch.amp.autocast(device_type=self.device, enabled=True):
-                    outputs = self.model(**inputs)
-            else:
-                outputs = self.model(**inputs)
-        
-        target_sizes = torch.tensor([[height, width]]).to(self.device)
+        target_sizes = torch.tensor([[height, width] for width, height in sizes]).to(self.device)
         
         # Bug 4: Use .get() for input_ids to handle different key names
         token_ids = inputs.get("input_ids", inputs.get("input_ids_batch"))
         
+        batch_results = self._post_process_detections(
+            outputs, token_ids, target_sizes, box_threshold, text_threshold
+        )
+        
+        if batch_results is None:
+            # Manual fallback
+            all_logits = outputs.logits.cpu().sigmoid()
+            all_boxes = outputs.pred_boxes.cpu()
+            formatted = []
+            for idx, (width, height) in enumerate(sizes):
+                logits = all_logits[idx]
+                boxes = all_boxes[idx]
+                
+                filt_mask = logits.max(dim=1)[0] > box_threshold
+                boxes_filt = boxes[filt_mask]
+                scores = logits[filt_mask].max(dim=1)[0].tolist()
+                
+                boxes_scaled = boxes_filt * torch.tensor([width, height, width, height])
+                boxes_list = boxes_scaled.tolist()
+                labels = [objects[0] if objects else "object"] * len(scores)
+                
+                formatted.append(
+                    self._format_detection_results(boxes_list, labels, scores, width, height, objects, is_cxcywh=True)
+                )
+            return formatted
+        
+        formatted = []
+        for results, (width, height) in zip(batch_results, sizes):
+            boxes = results["boxes"].cpu().numpy().tolist()
+            scores = results["scores"].cpu().numpy().tolist()
+            labels = results.get("labels", results.get("text", []))
+            
+            if isinstance(labels, list) and len(labels) > 0:
+                labels = [str(l) for l in labels]
+            else:
+                labels = [objects[0] if objects else "object"] * len(scores)
+            
+            formatted.append(
+                self._format_detection_results(boxes, labels, scores, width, height, objects, is_cxcywh=False)
+            )
+        return formatted
+
+    def _tokenize_prompt(self, text: str) -> Dict[str, torch.Tensor]:
+        """Return cached tokenizer outputs (input_ids, attention_mask, ...) for a prompt"""
+        cached = self._text_cache.get(text)
+        if cached is not None:
+            self._text_cache.move_to_end(text)
+            return cached
+        
+        if self._text_pad_length:
+            cached = dict(self.processor.tokenizer(
+                text, padding="max_length", max_length=self._text_pad_length, truncation=True, return_tensors="pt"
+            ))
+        else:
+            cached = dict(self.processor.tokenizer(text, return_tensors="pt"))
+        self._text_cache[text] = cached
+        while len(self._text_cache) > _TEXT_CACHE_SIZE:
+            self._text_cache.popitem(last=False)
+        return cached
+
+    def _padded_batch_size(self, batch: int) -> int:
+        """Round a batch up to the next power of two when the model is compiled for static shapes"""
+        if not self._pad_batches or batch <= 1:
+            return batch
+        return 1 << (batch - 1).bit_length()
+
+    def _prepare_inputs(self, inputs) -> Dict[str, torch.Tensor]:
+        """Move processor outputs to the device, casting pixel values to the model dtype in the same copy"""
+        if self._copy_stream is None:
+            return self._copy_inputs(inputs, pin=False)
+        
+        # Pinned host buffers let the copies run asynchronously on the side stream
+        with torch.cuda.stream(self._copy_stream):
+            prepared = self._copy_inputs(inputs, pin=True)
+        compute_stream = torch.cuda.current_stream()
+        compute_stream.wait_stream(self._copy_stream)
+        for value in prepared.values():
+            # Keep the caching allocator from reusing these blocks before compute is done with them
+            value.record_stream(compute_stream)
+        return prepared
+    
+    def _copy_inputs(self, inputs, pin: bool) -> Dict[str, torch.Tensor]:
+        prepared = {}
+        for key, value in inputs.items():
+            if pin:
+                value = value.pin_memory()
+            if key == "pixel_values":
+                dtype = torch.float16 if self.use_fp16 else value.dtype
+                value = value.to(self.device, dtype=dtype, non_blocking=True)
+                prepared[key] = value.contiguous(memory_format=torch.channels_last)
+            else:
+                prepared[key] = value.to(self.device, non_blocking=True)
+        return prepared
+
+    def _post_process_detections(
+        self,
+        outputs,
+        token_ids,
+        target_sizes: torch.Tensor,
+        box_threshold: float,
+        text_threshold: float
+    ) -> Optional[List[Dict]]:
+        """Post-process a batch of outputs, returning None when no processor API version matches"""
         # Try different API versions for post-processing
         try:
-            results = self.processor.post_process_grounded_object_detection(
+            return self.processor.post_process_grounded_object_detection(
                 outputs,
                 token_ids,
                 target_sizes=target_sizes,
                 box_threshold=box_threshold,
                 text_threshold=text_threshold
-            )[0]
+            )
         except TypeError:
-            try:
-                results = self.processor.post_process_grounded_object_detection(
-                    outputs,
-                    token_ids,
-                    target_sizes=target_sizes,
-                    threshold=box_threshold
-                )[0]
-            except TypeError:
-                try:
-                    results = self.processor.post_process_grounded_object_detection(
-                        outputs,
-                        threshold=box_threshold,
-                        target_sizes=target_sizes
-                    )[0]
-                except TypeError:
-                    # Manual fallback
-                    logits = outputs.logits.cpu().sigmoid()[0]
-                    boxes = outputs.pred_boxes.cpu()[0]
-                    
-                    filt_mask = logits.max(dim=1)[0] > box_threshold
-                    boxes_filt = boxes[filt_mask]
-                    scores = logits[filt_mask].max(dim=1)[0].tolist()
-                    
-                    boxes_scaled = boxes_filt * torch.tensor([width, height, width, height])
-                    boxes_list = boxes_scaled.tolist()
-                    labels = [objects[0] if objects else "object"] * len(scores)
-                    
-                    return self._format_detection_results(boxes_list, labels, scores, width, height, objects, is_cxcywh=True)
-        
-        boxes = results["boxes"].cpu().numpy().tolist()
-        scores = results["scores"].cpu().numpy().tolist()
-        labels = results.get("labels", results.get("text", []))
-        
-        if isinstance(labels, list) and len(labels) > 0:
-            labels = [str(l) for l in labels]
-        else:
-            labels = [objects[0] if objects else "object"] * len(scores)
-        
-        return self._format_detection_results(boxes, labels, scores, width, height, objects, is_cxcywh=False)
+            pass
+        try:
+            return self.processor.post_process_grounded_object_detection(
+                outputs,
+                token_ids,
+                target_sizes=target_sizes,
+                threshold=box_threshold
+            )
+        except TypeError:
+            pass
+        try:
+            return self.processor.post_process_grounded_object_detection(
+                outputs,
+                threshold=box_threshold,
+                target_sizes=target_sizes
+            )
+        except TypeError:
+            return None
     
     def _format_detection_results(
         self,
@@ -592,209 +969,171 @@ class AnnotationService:
         objects: List[str],
         is_cxcywh: bool = False
     ) -> Dict:
-        """Format detection results into standard format with label cleaning"""
-        normalized_boxes = []
-        cleaned_labels = []
-        valid_scores = []
-        
-        for idx, box in enumerate(boxes):
-            if is_cxcywh:
-                cx, cy, w, h = box
-                x1 = cx - w / 2
-                y1 = cy - h / 2
-                x2 = cx + w / 2
-                y2 = cy + h / 2
-            else:
-                x1, y1, x2, y2 = box
-            
-            # Clamp to image bounds
-            x1 = max(0, min(float(x1), width))
-            y1 = max(0, min(float(y1), height))
-            x2 = max(0, min(float(x2), width))
-            y2 = max(0, min(float(y2), height))
-            
-            # Skip degenerate boxes
-            if x2 <= x1 or y2 <= y1:
-                continue
-            
-            normalized_boxes.append({
-                "x": x1 / width,
-                "y": y1 / height,
-                "width": (x2 - x1) / width,
-                "height": (y2 - y1) / height,
-                "x1": float(x1),
-                "y1": float(y1),
-                "x2": float(x2),
-                "y2": float(y2)
-            })
-            
-            # Clean the label
-            label = labels[idx] if idx < len(labels) else (objects[0] if objects else "object")
-            cleaned_labels.append(self._clean_label(label, objects))
-            valid_scores.append(float(scores[idx]) if idx < len(scores) else 0.0)
+        """Clamp, filter and label-clean raw detections, keeping boxes as an (N, 4) xyxy array"""
+        boxes_arr = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if is_cxcywh:
+            half_wh = boxes_arr[:, 2:] / 2
+            boxes_arr = np.concatenate([boxes_arr[:, :2] - half_wh, boxes_arr[:, :2] + half_wh], axis=1)
+        
+        # Clamp to image bounds
+        boxes_arr = np.clip(boxes_arr, 0, [width, height, width, height])
+        
+        # Skip degenerate boxes
+        valid = (boxes_arr[:, 2] > boxes_arr[:, 0]) & (boxes_arr[:, 3] > boxes_arr[:, 1])
+        keep = np.flatnonzero(valid)
+        
+        default_label = objects[0] if objects else "object"
+        cleaned_labels = [
+            self._clean_label(labels[idx] if idx < len(labels) else default_label, objects)
+            for idx in keep
+        ]
+        score_arr = np.zeros(len(boxes_arr))
+        if len(scores):
+            count = min(len(scores), len(boxes_arr))
+            score_arr[:count] = np.asarray(scores, dtype=np.float64)[:count]
         
         return {
-            "boxes": normalized_boxes,
+            "boxes_xyxy": boxes_arr[keep],
             "labels": cleaned_labels,
-            "scores": valid_scores,
-            "segmentations": [],
+            "scores": score_arr[keep],
             "image_size": {"width": width, "height": height}
         }
+
+    @staticmethod
+    def _boxes_to_dicts(boxes_xyxy: np.ndarray, width: int, height: int) -> List[Dict]:
+        """Convert an (N, 4) xyxy array into the per-box dicts returned by annotate_image"""
+        normalized = boxes_xyxy / np.array([width, height, width, height], dtype=np.float64)
+        return [
+            {
+                "x": nx1,
+                "y": ny1,
+                "width": nx2 - nx1,
+                "height": ny2 - ny1,
+                "x1": x1,
+                "y1": y1,
+                "x2": x2,
+                "y2": y2
+            }
+            for (x1, y1, x2, y2), (nx1, ny1, nx2, ny2) in zip(boxes_xyxy.tolist(), normalized.tolist())
+        ]
     
-    def _compute_iou(self, box1: Dict, box2: Dict) -> float:
-        """Compute Intersection over Union between two boxes"""
-        x1 = max(box1["x1"], box2["x1"])
-        y1 = max(box1["y1"], box2["y1"])
-        x2 = min(box1["x2"], box2["x2"])
-        y2 = min(box1["y2"], box2["y2"])
+    @staticmethod
+    def _compute_iou(box: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """Compute Intersection over Union between one xyxy box and an (M, 4) array of boxes"""
+        x1 = np.maximum(box[0], others[:, 0])
+        y1 = np.maximum(box[1], others[:, 1])
+        x2 = np.minimum(box[2], others[:, 2])
+        y2 = np.minimum(box[3], others[:, 3])
         
-        intersection = max(0, x2 - x1) * max(0, y2 - y1)
+        intersection = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
         
-        area1 = (box1["x2"] - box1["x1"]) * (box1["y2"] - box1["y1"])
-        area2 = (box2["x2"] - box2["x1"]) * (box2["y2"] - box2["y1"])
+        area1 = (box[2] - box[0]) * (box[3] - box[1])
+        area2 = (others[:, 2] - others[:, 0]) * (others[:, 3] - others[:, 1])
         
         union = area1 + area2 - intersection
         
-        return intersection / union if union > 0 else 0
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
     
     def _apply_nms(
         self,
-        boxes: List[Dict],
+        boxes_xyxy: np.ndarray,
         labels: List[str],
-        scores: List[float],
+        scores: np.ndarray,
         iou_threshold: float = 0.5
-    ) -> Tuple[List[Dict], List[str], List[float]]:
+    ) -> Tuple[np.ndarray, List[str], np.ndarray]:
         """
-        Apply Non-Maximum Suppression to remove duplicate/overlapping boxes.
+        Apply per-label Non-Maximum Suppression to remove duplicate/overlapping boxes.
+        Returned detections are sorted by score descending.
         """
-        if not boxes:
-            return boxes, labels, scores
+        if not len(boxes_xyxy):
+            return boxes_xyxy, labels, scores
 
         label_groups: Dict[str, List[int]] = {}
-        for idx in range(len(boxes)):
+        for idx in range(len(boxes_xyxy)):
             label = labels[idx] if idx < len(labels) else "object"
             label_groups.setdefault(label, []).append(idx)
 
         keep: List[int] = []
         for group_indices in label_groups.values():
-            sorted_group = sorted(group_indices, key=lambda i: scores[i], reverse=True)
-            suppressed = set()
-            for pos, i in enumerate(sorted_group):
-                if i in suppressed:
-                    continue
-                keep.append(i)
-                for j in sorted_group[pos + 1 :]:
-                    if j in suppressed:
-                        continue
-                    iou = self._compute_iou(boxes[i], boxes[j])
-                    if iou > iou_threshold:
-                        suppressed.add(j)
+            order = np.asarray(group_indices)[np.argsort(-scores[group_indices], kind="stable")]
+            while len(order):
+                i = order[0]
+                keep.append(int(i))
+                if len(order) == 1:
+                    break
+                ious = self._compute_iou(boxes_xyxy[i], boxes_xyxy[order[1:]])
+                order = order[1:][ious <= iou_threshold]
 
         keep.sort(key=lambda i: scores[i], reverse=True)
         
         return (
-            [boxes[i] for i in keep],
+            boxes_xyxy[keep],
             [labels[i] for i in keep],
-            [scores[i] for i in keep]
+            scores[keep]
         )
     
     def _filter_small_boxes(
         self,
-        boxes: List[Dict],
+        boxes_xyxy: np.ndarray,
         labels: List[str],
-        scores: List[float],
+        scores: np.ndarray,
         min_size: int = 10
-    ) -> Tuple[List[Dict], List[str], List[float]]:
+    ) -> Tuple[np.ndarray, List[str], np.ndarray]:
         """Filter out boxes smaller than min_size in either dimension"""
-        if not boxes:
-            return boxes, labels, scores
+        if not len(boxes_xyxy):
+            return boxes_xyxy, labels, scores
         
-        keep_boxes = []
-        keep_labels = []
-        keep_scores = []
+        box_w = boxes_xyxy[:, 2] - boxes_xyxy[:, 0]
+        box_h = boxes_xyxy[:, 3] - boxes_xyxy[:, 1]
+        keep = np.flatnonzero((box_w >= min_size) & (box_h >= min_size))
         
-        for i, box in enumerate(boxes):
-            box_w = box["x2"] - box["x1"]
-            box_h = box["y2"] - box["y1"]
-            
-            if box_w >= min_size and box_h >= min_size:
-                keep_boxes.append(box)
-                keep_labels.append(labels[i] if i < len(labels) else "object")
-                keep_scores.append(scores[i] if i < len(scores) else 0.0)
+        return (
+            boxes_xyxy[keep],
+            [labels[i] if i < len(labels) else "object" for i in keep],
+            scores[keep]
+        )
+    
+    def _set_image_cached(self, image_path: Optional[str], image_np: np.ndarray):
+        """Set the SAM image, restoring a cached ViT embedding when the same file was encoded recently"""
+        key = None
+        if image_path:
+            try:
+                key = (str(image_path), os.path.getmtime(image_path))
+            except OSError:
+                key = None
         
-        return keep_boxes, keep_labels, keep_scores
+        predictor = self.sam_predictor
+        cached = self._sam_embedding_cache.get(key) if key is not None else None
+        if cached is not None:
+            self._sam_embedding_cache.move_to_end(key)
+            predictor.features, predictor.original_size, predictor.input_size = cached
+            predictor.is_image_set = True
+            return
+        
+        predictor.set_image(image_np)
+        if key is not None and SAM_EMBEDDING_CACHE_SIZE > 0:
+            self._sam_embedding_cache[key] = (predictor.features, predictor.original_size, predictor.input_size)
+            while len(self._sam_embedding_cache) > SAM_EMBEDDING_CACHE_SIZE:
+                self._sam_embedding_cache.popitem(last=False)
     
     def _run_segmentation_sync(
         self,
         image_np: np.ndarray,
-        boxes: List[Dict]
+        boxes: List[Dict],
+        image_path: Optional[str] = None
     ) -> List[List[List[float]]]:
         """Run SAM segmentation with iterative refinement and center-point guidance (synchronous)"""
-        
-        img_h, img_w = image_np.shape[:2]
-        
-        # Set image in SAM predictor (full resolution)
-        self.sam_predictor.set_image(image_np)
-        
+        masks = self._segment_masks(image_np, boxes, image_path)
         segmentations = []
         
-        for box in boxes:
+        for mask, box in zip(masks, boxes):
             try:
-                # Get box coordinates
-                x1, y1, x2, y2 = box["x1"], box["y1"], box["x2"], box["y2"]
-                
-                # Pad bounding box by 5%
-                box_w, box_h = x2 - x1, y2 - y1
-                pad_x = box_w * 0.05
-                pad_y = box_h * 0.05
-                padded_x1 = max(0, x1 - pad_x)
-                padded_y1 = max(0, y1 - pad_y)
-                padded_x2 = min(img_w, x2 + pad_x)
-                padded_y2 = min(img_h, y2 + pad_y)
-                input_box = np.array([padded_x1, padded_y1, padded_x2, padded_y2])
-                
-                # Center point of the box
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
-                point_coords = np.array([[center_x, center_y]])
-                point_labels = np.array([1])  # 1 = foreground
-                
-                # --- PASS 1: Initial prediction with box + center point prompt ---
-                masks, quality_scores, low_res_masks = self.sam_predictor.predict(
-                    point_coords=point_coords,
-                    point_labels=point_labels,
-                    box=input_box,
-                    multimask_output=True
-                )
-                
-                # Pick best mask from pass 1
-                best_idx = np.argmax(quality_scores)
-                best_low_res = low_res_masks[best_idx:best_idx+1]
-                
-                # --- PASS 2: Refine with the low-res mask from pass 1 ---
-                masks_refined, quality_refined, _ = self.sam_predictor.predict(
-                    point_coords=point_coords,
-                    point_labels=point_labels,
-                    box=input_box,
-                    mask_input=best_low_res,
-                    multimask_output=False
-                )
-                
-                # Use the refined mask
-                mask = masks_refined[0].astype(np.uint8)
-                
-                # Morphological cleanup
-                kernel_close = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-                kernel_open = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-                mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel_open)
-                mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel_close)
-                
                 # Extract contours
                 contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
                 
                 if contours:
                     # Keep significant contours only
-                    box_area = box_w * box_h
+                    box_area = float((box["x2"] - box["x1"]) * (box["y2"] - box["y1"]))
                     min_area = max(50, box_area * 0.01)
                     significant = [c for c in contours if cv2.contourArea(c) >= min_area]
                     
@@ -819,6 +1158,109 @@ class AnnotationService:
                 segmentations.append([])
         
         return segmentations
+
+    def _segment_masks(
+        self,
+        image_np: np.ndarray,
+        boxes: List[Dict],
+        image_path: Optional[str] = None
+    ) -> List[np.ndarray]:
+        """Predict one cleaned (H, W) uint8 SAM mask per box"""
+        img_h, img_w = image_np.shape[:2]
+        
+        # Set image in SAM predictor (full resolution), reusing the embedding on cache hits
+        self._set_image_cached(image_path, image_np)
+        
+        # Pad every bounding box by 5% and use its center as a foreground point
+        coords = np.array([[box["x1"], box["y1"], box["x2"], box["y2"]] for box in boxes], dtype=np.float32)
+        box_w = coords[:, 2] - coords[:, 0]
+        box_h = coords[:, 3] - coords[:, 1]
+        padded = np.stack([
+            np.maximum(0, coords[:, 0] - box_w * 0.05),
+            np.maximum(0, coords[:, 1] - box_h * 0.05),
+            np.minimum(img_w, coords[:, 2] + box_w * 0.05),
+            np.minimum(img_h, coords[:, 3] + box_h * 0.05),
+        ], axis=1)
+        centers = np.stack([
+            (coords[:, 0] + coords[:, 2]) / 2,
+            (coords[:, 1] + coords[:, 3]) / 2,
+        ], axis=1)[:, None, :]
+        
+        masks = []
+        for start in range(0, len(boxes), SAM_BOX_BATCH_SIZE):
+            stop = start + SAM_BOX_BATCH_SIZE
+            masks.extend(self._predict_masks_batch(padded[start:stop], centers[start:stop], (img_h, img_w)))
+        
+        # Morphological cleanup
+        kernel_close = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+        kernel_open = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        cleaned = []
+        for mask in masks:
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel_open)
+            cleaned.append(cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel_close))
+        return cleaned
+
+    @staticmethod
+    def _encode_rles(masks: List[np.ndarray]) -> List[Dict]:
+        """Encode all masks of an image in one pycocotools call; each RLE also carries its pixel area"""
+        if not masks:
+            return []
+        stacked = np.asfortranarray(np.stack(masks, axis=-1).astype(np.uint8))
+        rles = mask_util.encode(stacked)
+        areas = mask_util.area(rles)
+        return [
+            {"size": [int(v) for v in rle["size"]], "counts": rle["counts"].decode("ascii"), "area": float(area)}
+            for rle, area in zip(rles, areas)
+        ]
+
+    def _predict_masks_batch(
+        self,
+        padded_boxes: np.ndarray,
+        centers: np.ndarray,
+        image_shape: Tuple[int, int]
+    ) -> np.ndarray:
+        """Decode refined SAM masks for a group of boxes in two batched decoder passes"""
+        predictor = self.sam_predictor
+        device = predictor.device
+        count = len(padded_boxes)
+        
+        boxes_t = torch.as_tensor(padded_boxes, dtype=torch.float, device=device)
+        boxes_t = predictor.transform.apply_boxes_torch(boxes_t, image_shape)
+        points_t = torch.as_tensor(centers, dtype=torch.float, device=device)
+        points_t = predictor.transform.apply_coords_torch(points_t, image_shape)
+        labels_t = torch.ones((count, 1), dtype=torch.int, device=device)  # 1 = foreground
+        
+        with torch.inference_mode():
+            # --- PASS 1: Initial prediction with box + center point prompt ---
+            # Only the low-res logits are needed here, so skip predict_torch's full-size upscaling.
+            sparse, dense = predictor.model.prompt_encoder(
+                points=(points_t, labels_t),
+                boxes=boxes_t,
+                masks=None,
+            )
+            low_res_masks, quality_scores = predictor.model.mask_decoder(
+                image_embeddings=predictor.features,
+                image_pe=predictor.model.prompt_encoder.get_dense_pe(),
+                sparse_prompt_embeddings=sparse,
+                dense_prompt_embeddings=dense,
+                multimask_output=True,
+            )
+            
+            # Pick best mask per box from pass 1
+            best_idx = quality_scores.argmax(dim=1)
+            best_low_res = low_res_masks[torch.arange(count, device=device), best_idx].unsqueeze(1)
+            
+            # --- PASS 2: Refine with the low-res mask from pass 1 ---
+            masks_refined, _, _ = predictor.predict_torch(
+                point_coords=points_t,
+                point_labels=labels_t,
+                boxes=boxes_t,
+                mask_input=best_low_res,
+                multimask_output=False,
+            )
+        
+        # Single device-to-host copy for the whole group
+        return masks_refined[:, 0].to(torch.uint8).cpu().numpy()
     
     # Bug 3: Unified default thresholds (0.25 / 0.20)
     async def annotate_batch(
@@ -830,29 +1272,46 @@ class AnnotationService:
         use_sam: bool = True,
         nms_threshold: float = 0.5,
         min_box_size: int = 10,
-        progress_callback=None
+        progress_callback=None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        mask_format: str = "polygon"
     ) -> Dict[str, Dict]:
-        """Annotate multiple images"""
+        """Annotate multiple images, running detection in batches of ``batch_size``"""
         results = {}
         total = len(image_paths)
+        batch_size = max(1, batch_size)
+        loop = asyncio.get_event_loop()
+        last_progress = loop.time()
         
-        for i, image_path in enumerate(image_paths):
+        for start in range(0, total, batch_size):
+            batch_paths = image_paths[start:start + batch_size]
             try:
-                result = await self.annotate_image(
-                    image_path, objects, box_threshold, text_threshold,
-                    use_sam, nms_threshold, min_box_size
+                batch_results = await self.annotate_batch_gpu(
+                    batch_paths, objects, box_threshold, text_threshold,
+                    use_sam, nms_threshold, min_box_size, mask_format=mask_format
                 )
-                results[image_path] = result
             except Exception as e:
-                results[image_path] = {
-                    "error": str(e),
-                    "boxes": [],
-                    "labels": [],
-                    "scores": [],
-                    "segmentations": []
-                }
+                batch_results = [
+                    {
+                        "error": str(e),
+                        "boxes": [],
+                        "labels": [],
+                        "scores": [],
+                        "segmentations": []
+                    }
+                    for _ in batch_paths
+                ]
             
-            if progress_callback:
-                await progress_callback(i + 1, total, image_path)
+            for offset, (image_path, result) in enumerate(zip(batch_paths, batch_results)):
+                results[image_path] = result
+                done = start + offset + 1
+                # Coalesce intermediate updates; the final one is always sent so consumers reach 100%
+                if progress_callback and (
+                    done == total
+                    or done % _PROGRESS_EVERY_IMAGES == 0
+                    or loop.time() - last_progress > _PROGRESS_INTERVAL_SECONDS
+                ):
+                    await progress_callback(done, total, image_path)
+                    last_progress = loop.time()
         
         return results
@@ -205,9 +205,9 @@ class DatasetService:
             lines = []
             for mask in sample["masks"]:
                 class_name = mask.get("class_name")
-                if class_name not in class_to_id:
+                class_id = class_to_id.get(class_name)
+                if class_id is None:
                     continue
-                class_id = class_to_id[class_name]
                 polygon = mask.get("polygon", [])
                 if len(polygon) < 3:
                     continue
@@ -226,6 +226,8 @@ class DatasetService:
 
     def _build_coco(self, project_data: Dict, samples: List[Dict], class_to_id: Dict[str, int]) -> Dict:
         categories = [{"id": v + 1, "name": k} for k, v in class_to_id.items()]
+        # COCO category ids are 1-based
+        category_ids = {name: cid + 1 for name, cid in class_to_id.items()}
         images = []
         annotations = []
         ann_id = 1
@@ -235,8 +237,8 @@ class DatasetService:
             images.append({"id": idx, "file_name": sample["filename"], "width": w, "height": h})
 
             for mask in sample["masks"]:
-                class_name = mask.get("class_name")
-                if class_name not in class_to_id:
+                category_id = category_ids.get(mask.get("class_name"))
+                if category_id is None:
                     continue
                 polygon = mask.get("polygon", [])
                 if len(polygon) < 3:
@@ -254,7 +256,7 @@ class DatasetService:
                     {
                         "id": ann_id,
                         "image_id": idx,
-                        "category_id": class_to_id[class_name] + 1,
+                        "category_id": category_id,
                         "bbox": bbox,
                         "area": area,
                         "iscrowd": 0,
@@ -284,6 +286,10 @@ class DatasetService:
             area += x1 * y2 - x2 * y1
         return abs(area) / 2.0
 
+    @staticmethod
+    def _polygon_array(polygon: List[List[float]]) -> np.ndarray:
+        return np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+
     @staticmethod
     def _flatten_polygon(polygon: List[List[float]]) -> List[float]:
         flattened: List[float] = []
@@ -298,12 +304,12 @@ class DatasetService:
 
         masks = []
         for mask in sample["masks"]:
-            poly = []
-            for x, y in mask["polygon"]:
-                nx = (w - 1 - x) if horizontal else x
-                ny = y if horizontal else (h - 1 - y)
-                poly.append([float(nx), float(ny)])
-            masks.append({**mask, "polygon": poly})
+            pts = self._polygon_array(mask["polygon"])
+            if horizontal:
+                pts[:, 0] = w - 1 - pts[:, 0]
+            else:
+                pts[:, 1] = h - 1 - pts[:, 1]
+            masks.append({**mask, "polygon": pts.tolist()})
 
         return {**sample, "image": flipped, "masks": masks, "width": w, "height": h}
 
@@ -332,11 +338,9 @@ class DatasetService:
 
         masks = []
         for mask in sample["masks"]:
-            poly = []
-            for x, y in mask["polygon"]:
-                nx, ny = transform(x, y)
-                poly.append([float(nx), float(ny)])
-            masks.append({**mask, "polygon": poly})
+            pts = self._polygon_array(mask["polygon"])
+            nx, ny = transform(pts[:, 0], pts[:, 1])
+            masks.append({**mask, "polygon": np.stack([nx, ny], axis=1).tolist()})
 
         return {**sample, "image": rotated, "masks": masks, "width": new_w, "height": new_h}
 
@@ -349,14 +353,9 @@ class DatasetService:
 
         masks = []
         for mask in sample["masks"]:
-            poly = []
-            for x, y in mask["polygon"]:
-                px = matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2]
-                py = matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2]
-                px = float(min(max(px, 0.0), w - 1.0))
-                py = float(min(max(py, 0.0), h - 1.0))
-                poly.append([px, py])
-            masks.append({**mask, "polygon": poly})
+            pts = self._polygon_array(mask["polygon"]) @ matrix[:, :2].T + matrix[:, 2]
+            pts = np.clip(pts, 0.0, [w - 1.0, h - 1.0])
+            masks.append({**mask, "polygon": pts.tolist()})
 
         return {**sample, "image": rotated, "masks": masks, "width": w, "height": h}
 
@@ -376,8 +375,8 @@ class DatasetService:
         sy = target_h / float(h)
         masks = []
         for mask in sample["masks"]:
-            poly = [[float(x * sx), float(y * sy)] for x, y in mask["polygon"]]
-            masks.append({**mask, "polygon": poly})
+            pts = self._polygon_array(mask["polygon"]) * [sx, sy]
+            masks.append({**mask, "polygon": pts.tolist()})
 
         return {**sample, "image": resized, "masks": masks, "width": target_w, "height": target_h}
 
@@ -395,10 +394,8 @@ class DatasetService:
             h, w = sample["image"].shape[:2]
             sx, sy = base_w / float(w), base_h / float(h)
             for mask in sample["masks"]:
-                poly = []
-                for x, y in mask["polygon"]:
-                    poly.append([float(x * sx + ox), float(y * sy + oy)])
-                all_masks.append({**mask, "polygon": poly})
+                pts = self._polygon_array(mask["polygon"]) * [sx, sy] + [ox, oy]
+                all_masks.append({**mask, "polygon": pts.tolist()})
 
         return {
             "image": mosaic,
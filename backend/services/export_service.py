@@ -2,14 +2,217 @@
 Export Service - Convert annotations to multiple formats (COCO, YOLO, VOC, Roboflow)
 """
 
+import io
 import os
 import json
+import shutil
+import asyncio
+import hashlib
 import zipfile
-import yaml
+import numpy as np
+from collections import OrderedDict, deque
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
-from defusedxml import ElementTree as ET
+from services.io_pool import IO_WORKERS, io_executor, run_blocking
+# Output-only XML building: defusedxml guards parsing and does not provide Element/SubElement
+import xml.etree.ElementTree as ET
+
+try:
+    from lxml import etree as LET
+except ImportError:  # stdlib ElementTree + ET.indent is used instead
+    LET = None
+
+# zlib-ng is API-compatible with zlib and 2-3x faster at DEFLATE/CRC32 (SIMD match search + PCLMUL CRC)
+try:
+    from zlib_ng import zlib_ng as zlib
+except ImportError:
+    import zlib
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, several times slower on large exports
+    orjson = None
+
+
+def _json_default(obj: Any):
+    """Serialize numpy scalars/arrays for the stdlib fallback (orjson handles them natively)"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Encode ``obj`` as UTF-8 JSON bytes, pretty-printed only when ``indent`` is set"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2, default=_json_default).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+# Sessions whose class names / prepared images stay cached between exports; least recently used go first
+EXPORT_CACHE_SESSIONS = int(os.environ.get("EXPORT_CACHE_SESSIONS", "8"))
+
+# (image path, annotation, image_size) resolved once per export and shared by every exporter
+PreparedImage = Tuple[Path, Dict, Dict]
+_DEFAULT_IMAGE_SIZE = {"width": 1920, "height": 1080}
+
+# Export files are DEFLATE-compressed in parallel on the shared IO pool, then appended to the archive in order
+ZIP_WORKERS = IO_WORKERS
+# Compressed payloads waiting to be written, per worker; bounds memory to a few files instead of the whole export
+_ZIP_IN_FLIGHT_PER_WORKER = 2
+_ZIP_COMPRESS_LEVEL = 6
+# Already-compressed payloads gain nothing from DEFLATE and are stored as-is
+_ZIP_STORED_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def _compress_member(zinfo: zipfile.ZipInfo, data: bytes) -> bytes:
+    """Fill in ``zinfo`` sizes/CRC for ``data`` and return its payload: raw DEFLATE (what ZIP_DEFLATED stores)"""
+    if zinfo.compress_type == zipfile.ZIP_STORED:
+        compressed = data
+    else:
+        compressor = zlib.compressobj(_ZIP_COMPRESS_LEVEL, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+    zinfo.file_size = len(data)
+    zinfo.compress_size = len(compressed)
+    zinfo.CRC = zlib.crc32(data)
+    return compressed
+
+
+def _write_precompressed(zipf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, compressed: bytes):
+    """
+    Append an already-compressed member, doing the bookkeeping ZipFile.write does after compressing.
+    Relies on undocumented ZipFile internals; only used once _precompressed_writes_supported() passed.
+    """
+    zinfo.header_offset = zipf.fp.tell()
+    zipf.fp.write(zinfo.FileHeader())
+    zipf.fp.write(compressed)
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+    zipf.start_dir = zipf.fp.tell()
+    zipf._didModify = True
+
+
+@lru_cache(maxsize=None)
+def _precompressed_writes_supported() -> bool:
+    """Round-trip a small archive through _write_precompressed; False when this zipfile's internals differ"""
+    data = b"precompressed zip member probe\n" * 64
+    try:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            zinfo = zipfile.ZipInfo("probe.txt", date_time=(2020, 1, 1, 0, 0, 0))
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            _write_precompressed(zipf, zinfo, _compress_member(zinfo, data))
+        with zipfile.ZipFile(buf) as zipf:
+            return zipf.testzip() is None and zipf.read("probe.txt") == data
+    except Exception:
+        return False
+
+
+def _compress_file(file_path: Path, arcname: str) -> Tuple[zipfile.ZipInfo, bytes]:
+    """Build one member's ZipInfo and payload: compressed, stored for images, or raw when writestr must compress"""
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    data = file_path.read_bytes()
+    stored = file_path.suffix.lower() in _ZIP_STORED_SUFFIXES
+    zinfo.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+    if not _precompressed_writes_supported():
+        return zinfo, data
+    return zinfo, _compress_member(zinfo, data)
+
+
+def _write_member(zipf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, payload: bytes):
+    """Append one member built by _compress_file"""
+    if _precompressed_writes_supported():
+        _write_precompressed(zipf, zinfo, payload)
+    else:
+        # Public API fallback: compression happens here, in the writing thread
+        zipf.writestr(zinfo, payload, compresslevel=_ZIP_COMPRESS_LEVEL)
+
+
+async def _zip_files(base_dir: Path, paths: List[Path], zip_path: Path):
+    """
+    Zip ``paths`` (stored relative to ``base_dir``) with per-file compression spread over the shared IO pool.
+    Scheduling stays on the event loop, so no pool thread ever blocks waiting on another pool job.
+    """
+    files = [(file_path, file_path.relative_to(base_dir).as_posix()) for file_path in paths]
+    
+    loop = asyncio.get_running_loop()
+    in_flight = max(1, min(ZIP_WORKERS, len(files))) * _ZIP_IN_FLIGHT_PER_WORKER
+    zipf = await run_blocking(zipfile.ZipFile, zip_path, 'w', zipfile.ZIP_DEFLATED)
+    pending = deque()
+    try:
+        # Keep at most ``in_flight`` payloads in memory, written one at a time in submission order
+        for item in files:
+            pending.append(loop.run_in_executor(io_executor, _compress_file, *item))
+            if len(pending) >= in_flight:
+                await run_blocking(_write_member, zipf, *(await pending.popleft()))
+        while pending:
+            await run_blocking(_write_member, zipf, *(await pending.popleft()))
+    finally:
+        if pending:
+            # Let in-flight compressions finish before the archive is closed underneath them
+            await asyncio.gather(*pending, return_exceptions=True)
+        await run_blocking(zipf.close)
+
+
+# Below this many vertices building an ndarray costs more than the Python shoelace loop
+_SHOELACE_NUMPY_MIN_POINTS = 32
+
+
+def _polygon_area(poly: List[float]) -> float:
+    """Shoelace area of a flat ``[x1, y1, x2, y2, ...]`` polygon"""
+    n = len(poly) // 2
+    if n < _SHOELACE_NUMPY_MIN_POINTS:
+        xs = poly[0:2 * n:2]
+        ys = poly[1:2 * n:2]
+        area = 0.0
+        for j in range(n):
+            k = j + 1 if j + 1 < n else 0
+            area += xs[j] * ys[k] - xs[k] * ys[j]
+        return abs(area) / 2
+    arr = np.asarray(poly[:2 * n], dtype=np.float64).reshape(-1, 2)
+    x, y = arr[:, 0], arr[:, 1]
+    return float(0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+
+# Streamed JSON goes through a buffer this large, so the many small encoded records become few write(2) calls
+_JSON_WRITE_BUFFER = 4 * 1024 * 1024
+
+
+def _write_json_array_stream(fp, header_obj: Dict, arrays: List[Tuple[str, Iterable]]):
+    """
+    Write ``header_obj`` extended with one JSON array per ``(key, items)`` pair to binary file ``fp``.
+    Items are encoded as they are produced, so the arrays are never held in memory.
+    """
+    header = _dumps(header_obj)[:-1]  # reopen the header object
+    fp.write(header)
+    needs_comma = len(header) > 1
+    for key, items in arrays:
+        if needs_comma:
+            fp.write(b",")
+        fp.write(_dumps(key) + b":[")
+        first = True
+        for item in items:
+            if not first:
+                fp.write(b",")
+            fp.write(_dumps(item))
+            first = False
+        fp.write(b"]")
+        needs_comma = True
+    fp.write(b"}")
+
+
+def _write_json_file(path: Path, header_obj: Dict, arrays: List[Tuple[str, Iterable]]):
+    """Stream a JSON document to ``path`` through a large buffer, syncing it to disk once at the end"""
+    with open(path, 'wb', buffering=_JSON_WRITE_BUFFER) as fp:
+        _write_json_array_stream(fp, header_obj, arrays)
+        fp.flush()
+        os.fsync(fp.fileno())
 
 
 class ExportService:
@@ -17,6 +220,15 @@ class ExportService:
     
     def __init__(self, output_dir: Path):
         self.output_dir = output_dir
+        # Per-image label/XML files are formatted and written concurrently in the shared IO pool
+        self._pool = io_executor
+        # Decimals kept for COCO bbox/area (COCO's own files use 2); None keeps full float precision.
+        # Roboflow exports always keep full precision.
+        self.coord_precision: Optional[int] = 2
+        # session_id -> ((cache key, precision), annotations.json) of the last COCO serialization
+        self._coco_cache: Dict[str, Tuple[Tuple, Path]] = {}
+        # session_id -> {key, class_names, prepared} for back-to-back COCO/Roboflow exports of one annotation set
+        self._session_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
     
     async def export(
         self,
@@ -40,34 +252,91 @@ class ExportService:
         export_dir = self.output_dir / session_id / format
         export_dir.mkdir(parents=True, exist_ok=True)
         
-        # Get class names
-        class_names = self._extract_class_names(annotations)
+        # One timestamp for every file of this export
+        exported_at = datetime.now().isoformat()
         
+        # Only the COCO-based formats can reuse a cached annotations.json; hashing the set runs off the loop
+        coco_key = None
+        if format in ("coco", "roboflow"):
+            coco_key = await self._run(self._coco_cache_key, session_id, annotations, images)
+        
+        # Get class names and per-image sizes (reused while the content key matches)
+        class_names, prepared = self._session_data(session_id, annotations, images, coco_key)
+        
+        # Each exporter returns the files it wrote, so the zip step never has to walk the directory
         if format == "coco":
-            await self._export_coco(export_dir, annotations, images, class_names)
+            files = await self._export_coco(export_dir, prepared, class_names, coco_key, exported_at)
         elif format == "yolo":
-            await self._export_yolo(export_dir, annotations, images, class_names)
+            files = await self._export_yolo(export_dir, prepared, class_names)
         elif format == "voc":
-            await self._export_voc(export_dir, annotations, images, class_names)
+            files = await self._export_voc(export_dir, prepared, class_names)
         elif format == "roboflow":
-            await self._export_roboflow(export_dir, annotations, images, class_names)
+            files = await self._export_roboflow(export_dir, prepared, class_names, coco_key, exported_at)
         else:
             raise ValueError(f"Unsupported format: {format}")
         
         # Create metadata
-        await self._create_metadata(export_dir, session_id, format, class_names, len(images))
+        files += await self._create_metadata(export_dir, session_id, format, class_names, len(images), exported_at)
         
-        # Create zip file
+        # Create zip file (drop repeats so no member is added twice)
         zip_path = self.output_dir / f"{session_id}_{format}.zip"
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(export_dir):
-                for file in files:
-                    file_path = Path(root) / file
-                    arcname = file_path.relative_to(export_dir)
-                    zipf.write(file_path, arcname)
+        files = list(dict.fromkeys(files))
+        await _zip_files(export_dir, files, zip_path)
         
         return str(zip_path)
     
+    def cleanup_session(self, session_id: str):
+        """Forget the cached class names, image sizes and COCO output of a session"""
+        self._session_cache.pop(session_id, None)
+        self._coco_cache.pop(session_id, None)
+    
+    def _session_data(
+        self,
+        session_id: str,
+        annotations: Dict,
+        images: List[str],
+        content_key: Optional[Tuple]
+    ) -> Tuple[List[str], List[PreparedImage]]:
+        """Class names and prepared images, cached per session under the annotation content digest"""
+        cacheable = content_key is not None and content_key[1] is not None
+        cached = self._session_cache.get(session_id) if cacheable else None
+        if cached is not None and cached["key"] == content_key:
+            self._session_cache.move_to_end(session_id)
+            return cached["class_names"], cached["prepared"]
+        
+        class_names = self._extract_class_names(annotations)
+        prepared = self._prepare_images(annotations, images)
+        if cacheable:
+            self._session_cache[session_id] = {"key": content_key, "class_names": class_names, "prepared": prepared}
+            self._session_cache.move_to_end(session_id)
+            while len(self._session_cache) > EXPORT_CACHE_SESSIONS:
+                evicted, _ = self._session_cache.popitem(last=False)
+                self._coco_cache.pop(evicted, None)
+        return class_names, prepared
+    
+    async def _run(self, fn, *args):
+        """Run blocking file work in the shared IO pool"""
+        return await run_blocking(fn, *args)
+    
+    @staticmethod
+    def _prepare_images(annotations: Dict, images: List[str]) -> List[PreparedImage]:
+        """Resolve each image's Path, annotation and size once for all exporters"""
+        prepared = []
+        for image_path in images:
+            ann = annotations.get(image_path, {})
+            prepared.append((Path(image_path), ann, ann.get("image_size", _DEFAULT_IMAGE_SIZE)))
+        return prepared
+    
+    @staticmethod
+    def _coco_cache_key(session_id: str, annotations: Dict, images: List[str]) -> Tuple[str, Optional[str]]:
+        """Identify an annotation set by content, so any edit to labels/boxes/masks or the image list misses"""
+        try:
+            digest = hashlib.blake2b(_dumps([images, annotations]), digest_size=16).hexdigest()
+        except TypeError:
+            # Something the JSON encoder cannot hash; never match rather than risk a stale hit
+            digest = None
+        return (session_id, digest)
+    
     def _extract_class_names(self, annotations: Dict) -> List[str]:
         """Extract unique class names from annotations"""
         classes = set()
@@ -85,61 +354,87 @@ class ExportService:
     async def _export_coco(
         self,
         export_dir: Path,
-        annotations: Dict,
-        images: List[str],
-        class_names: List[str]
-    ):
-        """Export in COCO JSON format with segmentation support"""
+        prepared: List[PreparedImage],
+        class_names: List[str],
+        cache_key: Optional[Tuple] = None,
+        exported_at: Optional[str] = None,
+        full_precision: bool = False
+    ) -> List[Path]:
+        """Export in COCO JSON format with segmentation support, streamed one record at a time"""
+        precision = None if full_precision else self.coord_precision
         class_to_id = {name: i + 1 for i, name in enumerate(class_names)}
         
-        coco_data = {
+        header = {
             "info": {
                 "description": "Auto Annotation Tool Export",
-                "date_created": datetime.now().isoformat(),
+                "date_created": exported_at or datetime.now().isoformat(),
                 "version": "1.0"
             },
             "licenses": [],
             "categories": [
                 {"id": i + 1, "name": name, "supercategory": "object"}
                 for i, name in enumerate(class_names)
-            ],
-            "images": [],
-            "annotations": []
+            ]
         }
         
-        annotation_id = 1
+        # Save COCO JSON (compact: this is the large file of the export); encoding + writing run in the pool
+        await self._run(_write_json_file, export_dir / "annotations.json", header, [
+            ("images", self._gen_coco_images(prepared)),
+            ("annotations", self._gen_coco_anns(prepared, class_to_id, precision)),
+        ])
         
-        for image_id, image_path in enumerate(images, 1):
-            path = Path(image_path)
-            ann = annotations.get(image_path, {})
-            
-            # Get image size
-            size = ann.get("image_size", {"width": 1920, "height": 1080})
-            
-            coco_data["images"].append({
+        if cache_key is not None:
+            self._coco_cache[cache_key[0]] = ((cache_key, precision), export_dir / "annotations.json")
+        return [export_dir / "annotations.json"]
+    
+    def _gen_coco_images(self, prepared: List[PreparedImage]) -> Iterator[Dict]:
+        """Yield the COCO ``images`` records"""
+        for image_id, (path, _, size) in enumerate(prepared, 1):
+            yield {
                 "id": image_id,
                 "file_name": path.name,
                 "width": size["width"],
                 "height": size["height"]
-            })
-            
+            }
+    
+    def _gen_coco_anns(
+        self,
+        prepared: List[PreparedImage],
+        class_to_id: Dict[str, int],
+        precision: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """Yield the COCO ``annotations`` records with consecutive ids, bbox/area rounded to ``precision`` decimals"""
+        annotation_id = 1
+        
+        for image_id, (_, ann, size) in enumerate(prepared, 1):
             # Add annotations
             boxes = ann.get("boxes", [])
             labels = ann.get("labels", [])
             scores = ann.get("scores", [])
             segmentations = ann.get("segmentations", [])
+            rles = ann.get("rles", [])
+            if not boxes:
+                continue
+            
+            # Convert normalized to pixel coordinates for the whole image in one multiply
+            scale = np.array([size["width"], size["height"], size["width"], size["height"]], dtype=np.float64)
+            pixel_boxes = np.array(
+                [(box["x"], box["y"], box["width"], box["height"]) for box in boxes], dtype=np.float64
+            ) * scale
+            areas = pixel_boxes[:, 2] * pixel_boxes[:, 3]
+            if precision is not None:
+                # Shorter numbers = less to encode and write; sub-pixel digits beyond this carry no information
+                pixel_boxes = np.round(pixel_boxes, precision)
+                areas = np.round(areas, precision)
+            areas = areas.tolist()
+            pixel_boxes = pixel_boxes.tolist()
             
             for i, box in enumerate(boxes):
                 label = labels[i] if i < len(labels) else "unknown"
                 score = scores[i] if i < len(scores) else 1.0
                 
                 category_id = class_to_id.get(label, 1)
-                
-                # Convert normalized to pixel coordinates
-                x = box["x"] * size["width"]
-                y = box["y"] * size["height"]
-                w = box["width"] * size["width"]
-                h = box["height"] * size["height"]
+                x, y, w, h = pixel_boxes[i]
                 
                 # Build annotation entry
                 ann_entry = {
@@ -147,7 +442,7 @@ class ExportService:
                     "image_id": image_id,
                     "category_id": category_id,
                     "bbox": [x, y, w, h],
-                    "area": w * h,
+                    "area": areas[i],
                     "iscrowd": 0,
                     "score": score
                 }
@@ -157,18 +452,18 @@ class ExportService:
                     ann_entry["shape_type"] = box["shape_type"]
                 
                 # Bug 12: Only add segmentation when it has actual data
-                if i < len(segmentations) and segmentations[i] and len(segmentations[i]) > 0:
+                if i < len(rles) and rles[i]:
+                    # RLE masks from annotate_*(mask_format="rle") already carry their pixel area
+                    rle = rles[i]
+                    ann_entry["segmentation"] = {"size": rle["size"], "counts": rle["counts"]}
+                    ann_entry["area"] = rle.get("area", ann_entry["area"])
+                elif i < len(segmentations) and segmentations[i] and len(segmentations[i]) > 0:
                     ann_entry["segmentation"] = segmentations[i]
                     # Recalculate area from segmentation polygon
                     poly = segmentations[i][0]
                     if poly and len(poly) >= 6:
-                        n = len(poly) // 2
-                        area = 0
-                        for j in range(n):
-                            x1_p, y1_p = poly[2*j], poly[2*j + 1]
-                            x2_p, y2_p = poly[2*((j+1) % n)], poly[2*((j+1) % n) + 1]
-                            area += x1_p * y2_p - x2_p * y1_p
-                        ann_entry["area"] = abs(area) / 2
+                        area = _polygon_area(poly)
+                        ann_entry["area"] = round(area, precision) if precision is not None else area
                 else:
                     # Use bbox as segmentation fallback (4 corner points)
                     x1 = box.get("x1", x)
@@ -177,20 +472,15 @@ class ExportService:
                     y2 = box.get("y2", y + h)
                     ann_entry["segmentation"] = [[x1, y1, x2, y1, x2, y2, x1, y2]]
                 
-                coco_data["annotations"].append(ann_entry)
+                yield ann_entry
                 annotation_id += 1
-        
-        # Save COCO JSON
-        with open(export_dir / "annotations.json", 'w') as f:
-            json.dump(coco_data, f, indent=2)
     
     async def _export_yolo(
         self,
         export_dir: Path,
-        annotations: Dict,
-        images: List[str],
+        prepared: List[PreparedImage],
         class_names: List[str]
-    ):
+    ) -> List[Path]:
         """Export in YOLO format (separate .txt files)"""
         class_to_id = {name: i for i, name in enumerate(class_names)}
         
@@ -198,114 +488,145 @@ class ExportService:
         labels_dir.mkdir(exist_ok=True)
         
         # Create classes.txt
-        with open(export_dir / "classes.txt", 'w') as f:
-            f.write('\n'.join(class_names))
-        
-        # Bug 11: Use proper yaml import (no fallback class)
-        data_yaml = {
-            "path": ".",
-            "train": "images",
-            "val": "images",
-            "names": {i: name for i, name in enumerate(class_names)}
-        }
-        with open(export_dir / "data.yaml", 'w') as f:
-            yaml.dump(data_yaml, f)
+        await self._run((export_dir / "classes.txt").write_bytes, '\n'.join(class_names).encode("utf-8"))
+        
+        # data.yaml has a fixed schema, so it is templated directly instead of going through a YAML emitter;
+        # JSON-quoted names are valid YAML double-quoted scalars, which keeps ':' / '#' in class names safe
+        data_yaml = "path: .\ntrain: images\nval: images\nnames:\n" + "".join(
+            f"  {i}: {json.dumps(name)}\n" for i, name in enumerate(class_names)
+        )
+        await self._run((export_dir / "data.yaml").write_bytes, data_yaml.encode("utf-8"))
         
         # Create label files
-        for image_path in images:
-            path = Path(image_path)
-            ann = annotations.get(image_path, {})
-            
-            boxes = ann.get("boxes", [])
-            labels = ann.get("labels", [])
+        # Images sharing a stem map to one label file; keep the last one (as sequential writes did)
+        # so no two pool threads ever write the same path
+        label_jobs = {labels_dir / f"{path.stem}.txt": ann for path, ann, _ in prepared}
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._pool, self._write_yolo_label, label_file, ann, class_to_id)
+            for label_file, ann in label_jobs.items()
+        ))
+        return [export_dir / "classes.txt", export_dir / "data.yaml"] + list(label_jobs)
+    
+    @staticmethod
+    def _write_yolo_label(label_file: Path, ann: Dict, class_to_id: Dict[str, int]):
+        """Write one YOLO label file (runs in the export pool)"""
+        boxes = ann.get("boxes", [])
+        labels = ann.get("labels", [])
+        
+        lines = []
+        for i, box in enumerate(boxes):
+            label = labels[i] if i < len(labels) else "unknown"
+            class_id = class_to_id.get(label, 0)
             
-            label_file = labels_dir / f"{path.stem}.txt"
+            # YOLO format: class_id center_x center_y width height (normalized)
+            cx = box["x"] + box["width"] / 2
+            cy = box["y"] + box["height"] / 2
+            w = box["width"]
+            h = box["height"]
             
-            with open(label_file, 'w') as f:
-                for i, box in enumerate(boxes):
-                    label = labels[i] if i < len(labels) else "unknown"
-                    class_id = class_to_id.get(label, 0)
-                    
-                    # YOLO format: class_id center_x center_y width height (normalized)
-                    cx = box["x"] + box["width"] / 2
-                    cy = box["y"] + box["height"] / 2
-                    w = box["width"]
-                    h = box["height"]
-                    
-                    f.write(f"{class_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}\n")
+            lines.append(f"{class_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}\n")
+        
+        with open(label_file, 'w') as f:
+            f.write("".join(lines))
     
     async def _export_voc(
         self,
         export_dir: Path,
-        annotations: Dict,
-        images: List[str],
+        prepared: List[PreparedImage],
         class_names: List[str]
-    ):
+    ) -> List[Path]:
         """Export in Pascal VOC XML format"""
         
         annotations_dir = export_dir / "Annotations"
         annotations_dir.mkdir(exist_ok=True)
         
-        for image_path in images:
-            path = Path(image_path)
-            ann = annotations.get(image_path, {})
-            size = ann.get("image_size", {"width": 1920, "height": 1080})
-            
-            # Create XML structure
-            annotation = ET.Element("annotation")
-            
-            ET.SubElement(annotation, "folder").text = "images"
-            ET.SubElement(annotation, "filename").text = path.name
-            
-            size_elem = ET.SubElement(annotation, "size")
-            ET.SubElement(size_elem, "width").text = str(size["width"])
-            ET.SubElement(size_elem, "height").text = str(size["height"])
-            ET.SubElement(size_elem, "depth").text = "3"
+        # One job per XML path: images sharing a stem keep the last one's annotation, as sequential writes did
+        xml_jobs = {annotations_dir / f"{path.stem}.xml": (path, ann, size) for path, ann, size in prepared}
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._pool, self._write_voc_xml, xml_file, ann, size, path.name)
+            for xml_file, (path, ann, size) in xml_jobs.items()
+        ))
+        return list(xml_jobs)
+    
+    @staticmethod
+    def _write_voc_xml(path_out: Path, ann: Dict, size: Dict, name: str):
+        """Build and write one Pascal VOC XML file (runs in the export pool)"""
+        # lxml builds and pretty-prints the tree in C in a single pass
+        E = LET if LET is not None else ET
+        
+        # Create XML structure
+        annotation = E.Element("annotation")
+        
+        E.SubElement(annotation, "folder").text = "images"
+        E.SubElement(annotation, "filename").text = name
+        
+        size_elem = E.SubElement(annotation, "size")
+        E.SubElement(size_elem, "width").text = str(size["width"])
+        E.SubElement(size_elem, "height").text = str(size["height"])
+        E.SubElement(size_elem, "depth").text = "3"
+        
+        E.SubElement(annotation, "segmented").text = "0"
+        
+        boxes = ann.get("boxes", [])
+        labels = ann.get("labels", [])
+        scores = ann.get("scores", [])
+        
+        for i, box in enumerate(boxes):
+            label = labels[i] if i < len(labels) else "unknown"
             
-            ET.SubElement(annotation, "segmented").text = "0"
+            obj = E.SubElement(annotation, "object")
+            E.SubElement(obj, "name").text = label
+            E.SubElement(obj, "pose").text = "Unspecified"
+            E.SubElement(obj, "truncated").text = "0"
+            E.SubElement(obj, "difficult").text = "0"
             
-            boxes = ann.get("boxes", [])
-            labels = ann.get("labels", [])
-            scores = ann.get("scores", [])
+            if i < len(scores):
+                E.SubElement(obj, "confidence").text = str(scores[i])
             
-            for i, box in enumerate(boxes):
-                label = labels[i] if i < len(labels) else "unknown"
-                
-                obj = ET.SubElement(annotation, "object")
-                ET.SubElement(obj, "name").text = label
-                ET.SubElement(obj, "pose").text = "Unspecified"
-                ET.SubElement(obj, "truncated").text = "0"
-                ET.SubElement(obj, "difficult").text = "0"
-                
-                if i < len(scores):
-                    ET.SubElement(obj, "confidence").text = str(scores[i])
-                
-                # Include shape_type if available
-                if "shape_type" in box:
-                    ET.SubElement(obj, "shape_type").text = box["shape_type"]
-                
-                bndbox = ET.SubElement(obj, "bndbox")
-                ET.SubElement(bndbox, "xmin").text = str(int(box["x1"]))
-                ET.SubElement(bndbox, "ymin").text = str(int(box["y1"]))
-                ET.SubElement(bndbox, "xmax").text = str(int(box["x2"]))
-                ET.SubElement(bndbox, "ymax").text = str(int(box["y2"]))
+            # Include shape_type if available
+            if "shape_type" in box:
+                E.SubElement(obj, "shape_type").text = box["shape_type"]
             
-            xml_bytes = ET.tostring(annotation, encoding="utf-8")
-            with open(annotations_dir / f"{path.stem}.xml", 'wb') as f:
-                f.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
-                f.write(xml_bytes)
+            bndbox = E.SubElement(obj, "bndbox")
+            E.SubElement(bndbox, "xmin").text = str(int(box["x1"]))
+            E.SubElement(bndbox, "ymin").text = str(int(box["y1"]))
+            E.SubElement(bndbox, "xmax").text = str(int(box["x2"]))
+            E.SubElement(bndbox, "ymax").text = str(int(box["y2"]))
+        
+        if LET is not None:
+            xml_bytes = LET.tostring(annotation, pretty_print=True, encoding="utf-8", xml_declaration=False)
+        else:
+            ET.indent(annotation, space="  ")
+            xml_bytes = ET.tostring(annotation, encoding="utf-8", xml_declaration=False)
+        with open(path_out, 'wb') as f:
+            f.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
+            f.write(xml_bytes)
     
     async def _export_roboflow(
         self,
         export_dir: Path,
-        annotations: Dict,
-        images: List[str],
-        class_names: List[str]
-    ):
+        prepared: List[PreparedImage],
+        class_names: List[str],
+        cache_key: Optional[Tuple] = None,
+        exported_at: Optional[str] = None
+    ) -> List[Path]:
         """Export in Roboflow-compatible format"""
+        exported_at = exported_at or datetime.now().isoformat()
         
-        # Roboflow uses COCO format with additional metadata
-        await self._export_coco(export_dir, annotations, images, class_names)
+        # Roboflow uses COCO format with additional metadata; reuse the bytes of a matching COCO export
+        # only when that one was written unrounded too (coord_precision=None, or a previous Roboflow export)
+        cached = self._coco_cache.get(cache_key[0]) if cache_key is not None else None
+        reusable = cached is not None and cache_key[1] is not None and cached[0] == (cache_key, None)
+        if reusable and cached[1].exists():
+            if cached[1] != export_dir / "annotations.json":
+                await self._run(shutil.copyfile, cached[1], export_dir / "annotations.json")
+            files = [export_dir / "annotations.json"]
+        else:
+            files = await self._export_coco(
+                export_dir, prepared, class_names, cache_key, exported_at, full_precision=True
+            )
         
         # Add Roboflow-specific metadata
         roboflow_meta = {
@@ -314,11 +635,11 @@ class ExportService:
             "classes": class_names,
             "export_format": "coco",
             "created_by": "Auto Annotation Tool",
-            "created_at": datetime.now().isoformat()
+            "created_at": exported_at
         }
         
-        with open(export_dir / "_roboflow.json", 'w') as f:
-            json.dump(roboflow_meta, f, indent=2)
+        await self._run((export_dir / "_roboflow.json").write_bytes, _dumps(roboflow_meta, indent=True))
+        return files + [export_dir / "_roboflow.json"]
     
     async def _create_metadata(
         self,
@@ -326,22 +647,23 @@ class ExportService:
         session_id: str,
         format: str,
         class_names: List[str],
-        image_count: int
-    ):
+        image_count: int,
+        exported_at: Optional[str] = None
+    ) -> List[Path]:
         """Create metadata file"""
+        exported_at = exported_at or datetime.now().isoformat()
         
         metadata = {
             "session_id": session_id,
             "export_format": format,
             "class_names": class_names,
             "image_count": image_count,
-            "exported_at": datetime.now().isoformat(),
+            "exported_at": exported_at,
             "tool": "Auto Annotation Tool",
             "version": "1.0.0"
         }
         
-        with open(export_dir / "metadata.json", 'w') as f:
-            json.dump(metadata, f, indent=2)
+        await self._run((export_dir / "metadata.json").write_bytes, _dumps(metadata, indent=True))
         
         # Create README
         readme = f"""# Exported Annotations
@@ -350,7 +672,7 @@ class ExportService:
 - **Format**: {format.upper()}
 - **Images**: {image_count}
 - **Classes**: {', '.join(class_names)}
-- **Exported**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+- **Exported**: {exported_at[:19].replace('T', ' ')}
 
 ## Usage
 
@@ -374,5 +696,6 @@ model.train(data='data.yaml')
 ```
 """
         
-        with open(export_dir / "README.md", 'w') as f:
-            f.write(readme)
+        await self._run((export_dir / "README.md").write_bytes, readme.encode("utf-8"))
+        
+        return [export_dir / "metadata.json", export_dir / "README.md"]
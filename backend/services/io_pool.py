@@ -0,0 +1,17 @@
+"""
+IO Pool - Shared thread pool for blocking file work (exports, uploads, image probing)
+"""
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# One pool for every service so concurrent exports/uploads share threads instead of each spinning up its own
+IO_WORKERS = int(os.environ.get("IO_WORKERS", str(min(32, (os.cpu_count() or 1) * 2))))
+
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+
+async def run_blocking(fn, *args):
+    """Run ``fn(*args)`` in the shared IO pool without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(io_executor, fn, *args)
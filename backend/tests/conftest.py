@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Services import each other as top-level ``services.*``, the way main.py runs them
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
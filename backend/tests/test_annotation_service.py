@@ -0,0 +1,212 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("cv2")
+
+from services.annotation_service import AnnotationService
+
+_VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", "?", "cat", "dog", "traffic", "light"]
+
+
+@pytest.fixture(scope="module")
+def tiny_grounding_dino(tmp_path_factory):
+    """A randomly initialised, tiny Grounding DINO + processor; no weights are downloaded"""
+    from transformers import (
+        BertConfig,
+        BertTokenizer,
+        GroundingDinoConfig,
+        GroundingDinoForObjectDetection,
+        GroundingDinoProcessor,
+        SwinConfig,
+    )
+    try:
+        from transformers import GroundingDinoImageProcessorPil as ImageProcessor
+    except ImportError:
+        from transformers import GroundingDinoImageProcessor as ImageProcessor
+
+    vocab = tmp_path_factory.mktemp("tokenizer") / "vocab.txt"
+    vocab.write_text("\n".join(_VOCAB))
+    config = GroundingDinoConfig(
+        backbone_config=SwinConfig(
+            image_size=128, patch_size=4, embed_dim=16, depths=[1, 1, 1, 1], num_heads=[1, 1, 1, 1],
+            window_size=2, out_features=["stage2", "stage3", "stage4"],
+        ),
+        text_config=BertConfig(
+            vocab_size=len(_VOCAB), hidden_size=32, num_hidden_layers=1, num_attention_heads=2,
+            intermediate_size=64, max_position_embeddings=256,
+        ),
+        d_model=32, encoder_layers=1, decoder_layers=2, encoder_ffn_dim=64, decoder_ffn_dim=64,
+        encoder_attention_heads=2, decoder_attention_heads=2, num_queries=10, encoder_n_points=2,
+        decoder_n_points=2, max_text_len=256, use_timm_backbone=False, use_pretrained_backbone=False,
+    )
+    torch.manual_seed(0)
+    model = GroundingDinoForObjectDetection(config).eval()
+    processor = GroundingDinoProcessor(
+        image_processor=ImageProcessor(size={"shortest_edge": 128, "longest_edge": 128}),
+        tokenizer=BertTokenizer(str(vocab)),
+    )
+    return model, processor
+
+
+@pytest.fixture
+def service(tiny_grounding_dino, tmp_path):
+    model, processor = tiny_grounding_dino
+    service = AnnotationService(models_dir=tmp_path)
+    service.model = model
+    service.processor = processor
+    service.device = "cpu"
+    service.use_fp16 = False
+    service._copy_stream = None
+    service._fp8_autocast = None
+    service._model_loaded = True
+    return service
+
+
+def _images(count, seed=0):
+    rng = np.random.RandomState(seed)
+    return [rng.randint(0, 255, (96, 128, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def _detect(service, images, objects=("traffic light",)):
+    sizes = [(image.shape[1], image.shape[0]) for image in images]
+    return service._run_detection_batch_sync(images, list(objects), 0.0, 0.0, sizes)
+
+
+def _assert_same_detections(actual, expected):
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        np.testing.assert_allclose(got["boxes_xyxy"], want["boxes_xyxy"], rtol=1e-4, atol=1e-3)
+        np.testing.assert_allclose(got["scores"], want["scores"], rtol=1e-4, atol=1e-4)
+        assert got["labels"] == want["labels"]
+
+
+def test_tokenize_prompt_pads_to_fixed_length(service):
+    service._text_pad_length = 256
+
+    tokens = service._tokenize_prompt("traffic light.")
+
+    assert tokens["input_ids"].shape == (1, 256)
+    assert int(tokens["attention_mask"].sum()) == 5  # [CLS] traffic light . [SEP]
+
+
+def test_padded_prompt_gives_the_same_boxes(service):
+    images = _images(2)
+    service._text_pad_length = 0
+    unpadded = _detect(service, images)
+
+    service._text_pad_length = 256
+    service._text_cache.clear()
+    padded = _detect(service, images)
+
+    assert sum(len(result["boxes_xyxy"]) for result in unpadded) > 0
+    _assert_same_detections(padded, unpadded)
+
+
+def test_padded_batch_size_rounds_up_to_power_of_two(service):
+    service._pad_batches = True
+    assert [service._padded_batch_size(n) for n in (1, 2, 3, 5, 8)] == [1, 2, 4, 8, 8]
+    service._pad_batches = False
+    assert service._padded_batch_size(3) == 3
+
+
+def test_tail_batch_padding_is_trimmed_from_results(service):
+    images = _images(3, seed=1)
+    service._pad_batches = False
+    expected = _detect(service, images)
+
+    model = service.model
+    batch_sizes = []
+
+    def recording_model(**inputs):
+        batch_sizes.append(inputs["pixel_values"].shape[0])
+        return model(**inputs)
+
+    service._pad_batches = True
+    service.model = recording_model
+    padded = _detect(service, images)
+
+    assert batch_sizes == [4]
+    assert sum(len(result["boxes_xyxy"]) for result in expected) > 0
+    _assert_same_detections(padded, expected)
+
+
+
+def test_forward_detection_skips_fp8_for_a_shape_that_failed(service, monkeypatch):
+    calls = []
+
+    class FailingAutocast:
+        def __init__(self, **kwargs):
+            calls.append("fp8")
+
+        def __enter__(self):
+            raise RuntimeError("FP8 GEMM dims must be multiples of 16")
+
+        def __exit__(self, *exc):
+            return False
+
+    service._fp8_autocast = FailingAutocast
+    inputs = {"x": torch.zeros(3, 5)}
+    monkeypatch.setattr(service, "model", lambda **kwargs: "fp16-output")
+
+    assert service._forward_detection(inputs) == "fp16-output"
+    assert service._forward_detection(inputs) == "fp16-output"
+    # A different shape still gets its own FP8 attempt
+    service._forward_detection({"x": torch.zeros(4, 16)})
+
+    assert calls == ["fp8", "fp8"]
+
+
+def test_forward_detection_reraises_cuda_oom(service, monkeypatch):
+    class OomAutocast:
+        def __init__(self, **kwargs):
+            pass
+
+        def __enter__(self):
+            raise torch.cuda.OutOfMemoryError("CUDA out of memory")
+
+        def __exit__(self, *exc):
+            return False
+
+    service._fp8_autocast = OomAutocast
+    monkeypatch.setattr(service, "model", lambda **kwargs: "fp16-output")
+
+    with pytest.raises(torch.cuda.OutOfMemoryError):
+        service._forward_detection({"x": torch.zeros(1)})
+
+
+def _processor_outputs():
+    return {
+        "pixel_values": torch.rand(2, 3, 16, 16),
+        "pixel_mask": torch.ones(2, 16, 16, dtype=torch.long),
+        "input_ids": torch.tensor([[2, 7, 5, 3]] * 2),
+    }
+
+
+def test_prepare_inputs_casts_pixels_and_keeps_other_dtypes(service):
+    inputs = _processor_outputs()
+    service.use_fp16 = True
+
+    prepared = service._prepare_inputs(inputs)
+
+    assert prepared["pixel_values"].dtype == torch.float16
+    assert prepared["pixel_values"].is_contiguous(memory_format=torch.channels_last)
+    torch.testing.assert_close(prepared["pixel_values"].float(), inputs["pixel_values"], atol=1e-3, rtol=1e-3)
+    assert prepared["pixel_mask"].dtype == torch.long
+    assert torch.equal(prepared["input_ids"], inputs["input_ids"])
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="side copy stream needs CUDA")
+def test_copy_stream_inputs_match_a_plain_copy(service):
+    inputs = _processor_outputs()
+    service.device = "cuda"
+    expected = service._copy_inputs(inputs, pin=False)
+
+    service._copy_stream = torch.cuda.Stream()
+    prepared = service._prepare_inputs(inputs)
+    torch.cuda.current_stream().synchronize()
+
+    for key, value in expected.items():
+        assert prepared[key].device.type == "cuda"
+        assert torch.equal(prepared[key], value)
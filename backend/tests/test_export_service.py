@@ -0,0 +1,247 @@
+import asyncio
+import json
+import zipfile
+
+import pytest
+
+from services import export_service
+from services.export_service import ExportService, _zip_files
+
+
+def _make_export_tree(base_dir):
+    files = {
+        "annotations.json": b'{"images": [], "annotations": []}' * 200,
+        "labels/a.txt": b"0 0.5 0.5 0.1 0.1\n" * 500,
+        "images/a.jpg": bytes(range(256)) * 40,
+        "empty.txt": b"",
+    }
+    paths = []
+    for name, data in files.items():
+        path = base_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        paths.append(path)
+    return files, paths
+
+
+def _assert_round_trip(zip_path, files):
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == list(files)
+        for name, data in files.items():
+            assert zf.read(name) == data
+        assert zf.getinfo("images/a.jpg").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("labels/a.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_precompressed_writes_supported_on_this_python():
+    assert export_service._precompressed_writes_supported()
+
+
+def test_zip_files_round_trip(tmp_path, monkeypatch):
+    # A window smaller than the file count exercises the bounded in-flight path
+    monkeypatch.setattr(export_service, "ZIP_WORKERS", 1)
+    monkeypatch.setattr(export_service, "_ZIP_IN_FLIGHT_PER_WORKER", 1)
+    files, paths = _make_export_tree(tmp_path / "export")
+
+    asyncio.run(_zip_files(tmp_path / "export", paths, tmp_path / "out.zip"))
+
+    _assert_round_trip(tmp_path / "out.zip", files)
+
+
+@pytest.mark.parametrize("supported", [True, False])
+def test_zip_files_round_trip_with_and_without_precompressed_writes(tmp_path, monkeypatch, supported):
+    monkeypatch.setattr(export_service, "_precompressed_writes_supported", lambda: supported)
+    files, paths = _make_export_tree(tmp_path / "export")
+
+    asyncio.run(_zip_files(tmp_path / "export", paths, tmp_path / "out.zip"))
+
+    _assert_round_trip(tmp_path / "out.zip", files)
+
+
+def test_zip_files_completes_on_a_single_thread_io_pool(tmp_path, monkeypatch):
+    # Compression and writes share io_executor; with one thread any nested wait would deadlock
+    from concurrent.futures import ThreadPoolExecutor
+    from services import io_pool
+
+    single = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(io_pool, "io_executor", single)
+    monkeypatch.setattr(export_service, "io_executor", single)
+    files, paths = _make_export_tree(tmp_path / "export")
+
+    asyncio.run(asyncio.wait_for(_zip_files(tmp_path / "export", paths, tmp_path / "out.zip"), timeout=30))
+
+    _assert_round_trip(tmp_path / "out.zip", files)
+    single.shutdown()
+
+
+def _annotations():
+    return {
+        "/data/a.jpg": {
+            "image_size": {"width": 100, "height": 100},
+            "boxes": [{"x": 0.1, "y": 0.2, "width": 0.3, "height": 0.4}],
+            "labels": ["cat"],
+            "scores": [0.9],
+        }
+    }
+
+
+def _export(service, annotations, fmt):
+    zip_path = asyncio.run(service.export("s1", annotations, list(annotations), fmt))
+    with zipfile.ZipFile(zip_path) as zf:
+        names = zf.namelist()
+        coco = json.loads(zf.read("annotations.json")) if "annotations.json" in names else None
+        classes = zf.read("classes.txt").decode() if "classes.txt" in names else None
+    return coco, classes
+
+
+@pytest.fixture
+def counted_service(tmp_path):
+    service = ExportService(tmp_path)
+    service.coco_builds = 0
+    build = service._export_coco
+
+    async def counting_export_coco(*args, **kwargs):
+        service.coco_builds += 1
+        return await build(*args, **kwargs)
+
+    service._export_coco = counting_export_coco
+    return service
+
+
+def test_roboflow_reuses_cached_coco_for_unchanged_annotations(counted_service):
+    annotations = _annotations()
+
+    _export(counted_service, annotations, "roboflow")
+    _export(counted_service, annotations, "roboflow")
+
+    assert counted_service.coco_builds == 1
+
+
+def test_coco_cache_misses_after_in_place_label_edit(counted_service):
+    annotations = _annotations()
+    _export(counted_service, annotations, "roboflow")
+
+    annotations["/data/a.jpg"]["labels"][0] = "dog"
+    coco, _ = _export(counted_service, annotations, "roboflow")
+
+    assert counted_service.coco_builds == 2
+    assert [c["name"] for c in coco["categories"]] == ["dog"]
+
+
+def test_coco_cache_misses_after_entry_replaced_with_same_box_count(counted_service):
+    annotations = _annotations()
+    _export(counted_service, annotations, "roboflow")
+
+    annotations["/data/a.jpg"] = {
+        "image_size": {"width": 100, "height": 100},
+        "boxes": [{"x": 0.5, "y": 0.5, "width": 0.1, "height": 0.1}],
+        "labels": ["cat"],
+    }
+    coco, _ = _export(counted_service, annotations, "roboflow")
+
+    assert counted_service.coco_builds == 2
+    assert coco["annotations"][0]["bbox"] == [50.0, 50.0, 10.0, 10.0]
+
+
+def test_non_coco_formats_skip_the_content_hash(tmp_path, monkeypatch):
+    service = ExportService(tmp_path)
+
+    def fail(*args):
+        raise AssertionError("yolo/voc exports must not hash the annotation set")
+
+    monkeypatch.setattr(service, "_coco_cache_key", fail)
+    _, classes = _export(service, _annotations(), "yolo")
+
+    assert classes == "cat"
+
+
+def _odd_annotations():
+    return {
+        "/data/a.jpg": {
+            "image_size": {"width": 333, "height": 777},
+            "boxes": [{"x": 0.123456, "y": 0.3333, "width": 0.11111, "height": 0.2222}],
+            "labels": ["cat"],
+        }
+    }
+
+
+def test_coco_rounds_bbox_and_area_to_coord_precision(tmp_path):
+    coco, _ = _export(ExportService(tmp_path), _odd_annotations(), "coco")
+
+    ann = coco["annotations"][0]
+    assert ann["bbox"] == [41.11, 258.97, 37.0, 172.65]
+    assert ann["area"] == round(0.11111 * 333 * 0.2222 * 777, 2)
+
+
+def test_roboflow_keeps_full_precision_after_a_rounded_coco_export(counted_service):
+    annotations = _odd_annotations()
+    _export(counted_service, annotations, "coco")
+
+    coco, _ = _export(counted_service, annotations, "roboflow")
+
+    # The rounded COCO file must not be reused for Roboflow
+    assert counted_service.coco_builds == 2
+    assert coco["annotations"][0]["bbox"] == [0.123456 * 333, 0.3333 * 777, 0.11111 * 333, 0.2222 * 777]
+
+
+def test_roboflow_reuses_unrounded_coco_export(counted_service):
+    counted_service.coord_precision = None
+    annotations = _odd_annotations()
+    coco, _ = _export(counted_service, annotations, "coco")
+
+    roboflow, _ = _export(counted_service, annotations, "roboflow")
+
+    assert counted_service.coco_builds == 1
+    assert roboflow == coco
+
+
+def _count_class_scans(service, monkeypatch):
+    calls = []
+    scan = service._extract_class_names
+
+    def counting_scan(annotations):
+        calls.append(1)
+        return scan(annotations)
+
+    monkeypatch.setattr(service, "_extract_class_names", counting_scan)
+    return calls
+
+
+def test_session_cache_reused_across_coco_and_roboflow(tmp_path, monkeypatch):
+    service = ExportService(tmp_path)
+    scans = _count_class_scans(service, monkeypatch)
+    annotations = _annotations()
+
+    _export(service, annotations, "coco")
+    _export(service, annotations, "roboflow")
+
+    assert len(scans) == 1
+
+
+def test_session_cache_misses_after_label_edit(tmp_path, monkeypatch):
+    service = ExportService(tmp_path)
+    scans = _count_class_scans(service, monkeypatch)
+    annotations = _annotations()
+    _export(service, annotations, "coco")
+
+    annotations["/data/a.jpg"]["labels"][0] = "dog"
+    coco, _ = _export(service, annotations, "coco")
+
+    assert len(scans) == 2
+    assert [c["name"] for c in coco["categories"]] == ["dog"]
+
+
+def test_session_cache_is_bounded_and_cleared_by_cleanup_session(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_CACHE_SESSIONS", 2)
+    service = ExportService(tmp_path)
+    annotations = _annotations()
+    for session_id in ("s1", "s2", "s3"):
+        asyncio.run(service.export(session_id, annotations, list(annotations), "coco"))
+
+    assert list(service._session_cache) == ["s2", "s3"]
+    assert "s1" not in service._coco_cache
+
+    service.cleanup_session("s3")
+    assert "s3" not in service._session_cache
+    assert "s3" not in service._coco_cache
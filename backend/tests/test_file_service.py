@@ -0,0 +1,61 @@
+import asyncio
+import io
+import zipfile
+
+from PIL import Image
+
+from services.file_service import FileService
+
+
+def _jpeg_bytes(size=(64, 48)) -> bytes:
+    buf = io.BytesIO()
+    Image.effect_noise(size, 64).convert("RGB").save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def test_inspect_image_reads_header_only(tmp_path):
+    data = _jpeg_bytes()
+    truncated = tmp_path / "truncated.jpg"
+    truncated.write_bytes(data[: len(data) * 3 // 4])
+
+    ok, info = FileService(tmp_path, tmp_path).inspect_image(str(truncated))
+
+    assert ok
+    assert (info["width"], info["height"]) == (64, 48)
+
+
+def test_validate_image_rejects_truncated_pixel_data(tmp_path):
+    data = _jpeg_bytes()
+    good = tmp_path / "good.jpg"
+    good.write_bytes(data)
+    truncated = tmp_path / "truncated.jpg"
+    truncated.write_bytes(data[: len(data) * 3 // 4])
+
+    assert FileService.validate_image(str(good))
+    assert not FileService.validate_image(str(truncated))
+
+
+def test_extract_members_drops_undecodable_images(tmp_path):
+    data = _jpeg_bytes()
+    zip_path = tmp_path / "upload.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("good.jpg", data)
+        zf.writestr("truncated.jpg", data[: len(data) * 3 // 4])
+    session_dir = tmp_path / "session"
+    session_dir.mkdir()
+
+    service = FileService(tmp_path, tmp_path)
+    members = service._plan_extraction(zip_path, session_dir)
+    extracted = service._extract_members(zip_path, members)
+
+    assert [path.name for path in extracted] == ["good.jpg"]
+    assert not (session_dir / "truncated.jpg").exists()
+
+
+def test_get_image_info_runs_off_the_event_loop(tmp_path):
+    image = tmp_path / "a.jpg"
+    image.write_bytes(_jpeg_bytes((10, 20)))
+
+    info = asyncio.run(FileService(tmp_path, tmp_path).get_image_info(str(image)))
+
+    assert (info["width"], info["height"]) == (10, 20)